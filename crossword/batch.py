@@ -0,0 +1,132 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import wordcache
+from crossword import Crossword
+from generate import CrosswordCreator
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python batch.py manifest [results] [options]",
+        description=(
+            "Solve every job in a manifest of JSON lines, each with "
+            "\"structure\", \"words\" and optionally \"output\" paths "
+            "relative to the manifest, and write one JSON line per job."
+        )
+    )
+    parser.add_argument("manifest")
+    parser.add_argument("results", nargs="?")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of processes solving jobs (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--inference", default=CrosswordCreator.MAC,
+        choices=[CrosswordCreator.FORWARD, CrosswordCreator.MAC],
+        help="propagation after each assignment (default: mac)"
+    )
+    parser.add_argument(
+        "--search", default=CrosswordCreator.CHRONOLOGICAL,
+        choices=[CrosswordCreator.CHRONOLOGICAL, CrosswordCreator.BACKJUMP],
+        help="search strategy (default: chronological)"
+    )
+    args = parser.parse_args()
+
+    jobs = read_manifest(args.manifest)
+    for job in jobs:
+        job["inference"] = args.inference
+        job["search"] = args.search
+
+    # Compile each word list once up front, so that workers started from
+    # this process share it and only memory-map the cache otherwise
+    for words in set(job["words"] for job in jobs):
+        try:
+            wordcache.load(words)
+        except OSError:
+            pass
+
+    results = open(args.results, "w") if args.results else sys.stdout
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for result in pool.imap_unordered(run_job, jobs):
+                results.write(json.dumps(result) + "\n")
+                results.flush()
+    finally:
+        if results is not sys.stdout:
+            results.close()
+
+
+def read_manifest(manifest):
+    """
+    Return list of job dicts read from a manifest of JSON lines, with paths
+    resolved relative to the manifest's directory.
+    """
+    directory = os.path.dirname(os.path.abspath(manifest))
+    jobs = []
+    with open(manifest) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            for field in ["structure", "words", "output"]:
+                if job.get(field):
+                    job[field] = os.path.join(directory, job[field])
+            jobs.append(job)
+    return jobs
+
+
+def run_job(job):
+    """
+    Solve one job, saving its image if it has an output path, and return a
+    dict describing the result and the time taken by each step.
+    Word lists, their letter index and the glyph atlas are kept by each
+    worker process and reused by every job that needs them.
+    """
+    result = {
+        "structure": job["structure"],
+        "words": job["words"],
+        "output": job.get("output")
+    }
+    seconds = dict()
+    start = time.perf_counter()
+    try:
+        crossword = Crossword(job["structure"], job["words"])
+        seconds["load"] = time.perf_counter() - start
+
+        creator = CrosswordCreator(
+            crossword, inference=job["inference"], search=job["search"]
+        )
+        assignment = creator.solve()
+        seconds["solve"] = time.perf_counter() - start - seconds["load"]
+
+        if assignment is None:
+            result["status"] = "unsatisfiable"
+        else:
+            result["status"] = "solved"
+            result["solution"] = [
+                "".join(letter or "#" for letter in row)
+                for row in creator.letter_grid(assignment)
+            ]
+            if job.get("output"):
+                render_start = time.perf_counter()
+                creator.save(assignment, job["output"])
+                seconds["render"] = time.perf_counter() - render_start
+        result["nodes"] = creator.stats.nodes
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    seconds["total"] = time.perf_counter() - start
+    result["seconds"] = seconds
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+from crossword import Crossword
+from generate import CrosswordCreator, Restart, SolverStats
+
+CONFIGURATIONS = [
+    (inference, search)
+    for inference in [CrosswordCreator.FORWARD, CrosswordCreator.MAC]
+    for search in [CrosswordCreator.CHRONOLOGICAL, CrosswordCreator.BACKJUMP]
+]
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [report] [options]"
+    )
+    parser.add_argument("report", nargs="?", default="benchmark.json")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[5, 7, 9, 11],
+        help="side lengths of the random grids (default: 5 7 9 11)"
+    )
+    parser.add_argument(
+        "--densities", type=float, nargs="+", default=[0.5, 0.6, 0.7],
+        help="fractions of open cells in the random grids"
+    )
+    parser.add_argument(
+        "--grids", type=int, default=3,
+        help="random grids per size and density (default: 3)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed for generating grids (default: 0)"
+    )
+    parser.add_argument(
+        "--node-limit", type=int, default=100000,
+        help="give up on a run after this many nodes (default: 100000)"
+    )
+    args = parser.parse_args()
+
+    data = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    words_files = sorted(glob.glob(os.path.join(data, "words*.txt")))
+
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Bundled structures with their own word lists
+        structures = glob.glob(os.path.join(data, "structure*.txt"))
+        for structure in sorted(structures):
+            words = structure.replace("structure", "words")
+            if os.path.exists(words):
+                name = os.path.basename(structure)
+                runs.extend(benchmark(name, structure, words, args.node_limit))
+
+        # Random grids of increasing size and density against every word list
+        rng = random.Random(args.seed)
+        for size in args.sizes:
+            for density in args.densities:
+                for k in range(args.grids):
+                    name = f"random {size}x{size} {density:.2f} #{k}"
+                    structure = os.path.join(directory, "structure.txt")
+                    with open(structure, "w") as f:
+                        f.write(random_grid(rng, size, density))
+                    for words in words_files:
+                        runs.extend(
+                            benchmark(name, structure, words, args.node_limit)
+                        )
+
+    report = {
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "node_limit": args.node_limit,
+        "runs": runs
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for run in runs:
+        print(
+            f"{run['structure']:<26} {run['words']:<11} "
+            f"{run['inference']:<8} {run['search']:<14} {run['status']:<14} "
+            f"{run['stats']['nodes']:>8} nodes {run['seconds']:>9.4f}s"
+        )
+    print(f"Report written to {args.report}")
+
+
+def random_grid(rng, size, density):
+    """
+    Return a `size` by `size` crossword structure, in the format read by
+    Crossword, in which each cell is open with probability `density`.
+    """
+    rows = []
+    for i in range(size):
+        rows.append("".join(
+            "_" if rng.random() < density else "#" for j in range(size)
+        ))
+    return "\n".join(rows) + "\n"
+
+
+def benchmark(name, structure, words, node_limit):
+    """
+    Solve a structure with every search configuration, giving up after
+    `node_limit` nodes, and return a list of dicts describing each run.
+    """
+    crossword = Crossword(structure, words)
+    runs = []
+    for inference, search in CONFIGURATIONS:
+        stats = SolverStats(timing=True)
+        creator = CrosswordCreator(
+            crossword, inference=inference, search=search, stats=stats
+        )
+        creator.limit = node_limit
+        start = time.perf_counter()
+        try:
+            assignment = creator.solve()
+            status = "solved" if assignment is not None else "unsatisfiable"
+        except Restart:
+            status = "limit"
+        runs.append({
+            "structure": name,
+            "words": os.path.basename(words),
+            "variables": len(crossword.variables),
+            "inference": inference,
+            "search": search,
+            "status": status,
+            "seconds": time.perf_counter() - start,
+            "stats": stats.as_dict()
+        })
+    return runs
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import bisect
+
+import wordcache
+
+
 class Variable():
 
     ACROSS = "across"
@@ -15,9 +20,15 @@ class Variable():
                 (self.i + (k if self.direction == Variable.DOWN else 0),
                  self.j + (k if self.direction == Variable.ACROSS else 0))
             )
+        self._hash = hash((self.i, self.j, self.direction, self.length))
 
     def __hash__(self):
-        return hash((self.i, self.j, self.direction, self.length))
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild from arguments when unpickled, so the cached hash is
+        # recomputed in the receiving process
+        return (Variable, (self.i, self.j, self.direction, self.length))
 
     def __eq__(self, other):
         return (
@@ -57,9 +68,10 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, grouped by length
+        # For any length, words[length] is a sorted sequence of the words of
+        # that length, and a word's position in it is its word id
+        self.words = wordcache.load(words_file)
 
         # Determine variable set
         self.variables = set()
@@ -104,27 +116,94 @@ class Crossword():
                             length=length
                         ))
 
+        # Map each cell to the variables covering it, and the position of
+        # the cell within each of those variables
+        covering = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                covering.setdefault(cell, []).append((var, k))
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (cells1.index(intersection),cells2.index(intersection))
+        # Only overlapping pairs are stored; any other pair looks up as None
+        self.overlaps = Overlaps()
+        self.adjacency = {var: set() for var in self.variables}
+        for cell_vars in covering.values():
+            for v1, i in cell_vars:
+                for v2, j in cell_vars:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        self.adjacency[v1].add(v2)
+
+        # Index vocabulary by letter position
+        # For any (length, k), the index maps each letter to a bitmask of the
+        # ids of words of that length whose kth character is that letter
+        self.index = dict()
+        for length in set(var.length for var in self.variables):
+            words = self.words.get(length)
+            for k in range(length):
+                self.index[length, k] = words.letter_masks(k) if words else {}
 
     def neighbors(self, var):
-        """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        """
+        Given a variable, return set of overlapping variables.
+        The set is shared with the crossword and must not be modified.
+        """
+        return self.adjacency[var]
+
+    def components(self):
+        """
+        Return list of sets of variables, one for each connected component
+        of the constraint graph (i.e., each independent region of the grid).
+        """
+        components = []
+        seen = set()
+        for var in self.variables:
+            if var in seen:
+                continue
+            component = set()
+            frontier = [var]
+            seen.add(var)
+            while frontier:
+                v = frontier.pop()
+                component.add(v)
+                for neighbor in self.neighbors(v):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        frontier.append(neighbor)
+            components.append(component)
+        return components
+
+    def all_words(self, length):
+        """Return bitmask of every word id of a given length."""
+        return (1 << len(self.words.get(length, []))) - 1
+
+    def word_mask(self, word):
+        """Return bitmask holding just the id of `word`."""
+        words = self.words[len(word)]
+        return 1 << bisect.bisect_left(words, word)
+
+    def words_with(self, length, k, letter):
+        """
+        Return bitmask of words of `length` whose `k`th character is `letter`.
+        """
+        return self.index[length, k].get(letter, 0)
+
+    def words_in(self, length, mask):
+        """Given a bitmask of word ids of `length`, yield those words."""
+        words = self.words.get(length, [])
+        bits = format(mask, "b")[::-1]
+        k = bits.find("1")
+        while k != -1:
+            yield words[k]
+            k = bits.find("1", k + 1)
+
+
+class Overlaps(dict):
+    """Sparse overlap table, where pairs not stored do not overlap."""
+
+    def __missing__(self, key):
+        return None
+
@@ -1,20 +1,26 @@
-import sys
-import math
+import argparse
+import collections
+import contextlib
+import functools
+import heapq
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import time
 
 from crossword import Crossword, Variable
 
 
-class CrosswordCreator():
+class CrosswordPrinter():
 
     def __init__(self, crossword):
         """
-        Create new CSP crossword generate.
+        Create a printer of assignments for `crossword`, without any of the
+        state a CrosswordCreator needs to search for them.
         """
         self.crossword = crossword
-        self.domains = {
-            var: self.crossword.words.copy()
-            for var in self.crossword.variables
-        }
 
     def letter_grid(self, assignment):
         """
@@ -49,11 +55,11 @@ class CrosswordCreator():
         """
         Save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
+        from PIL import Image
         cell_size = 100
         cell_border = 2
-        interior_size = cell_size - 2 * cell_border
         letters = self.letter_grid(assignment)
+        atlas = glyph_atlas(cell_size, cell_border)
 
         # Create a blank canvas
         img = Image.new(
@@ -62,37 +68,187 @@ class CrosswordCreator():
              self.crossword.height * cell_size),
             "black"
         )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
 
+        # Paste pre-rendered cells rather than drawing each letter afresh
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
                 if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
+                    img.paste(
+                        atlas.cell(letters[i][j]),
+                        (j * cell_size + cell_border,
+                         i * cell_size + cell_border)
+                    )
 
         img.save(filename)
 
-    def solve(self):
+
+class CrosswordCreator(CrosswordPrinter):
+
+    FORWARD = "forward"
+    MAC = "mac"
+
+    CHRONOLOGICAL = "chronological"
+    BACKJUMP = "backjump"
+
+    def __init__(self, crossword, inference=MAC, search=CHRONOLOGICAL,
+                 seed=None, stats=None, lazy_values=False):
+        """
+        Create new CSP crossword generate.
+        `inference` selects what `backtrack` does after each assignment:
+        forward checking only, or maintaining arc consistency (MAC).
+        `search` selects chronological backtracking, or conflict-directed
+        backjumping with nogood learning.
+        If `seed` is given, ties in variable and value ordering are broken
+        at random using that seed.
+        `stats` is the SolverStats to record counters in; a new one without
+        phase timers is used if not given.
+        If `lazy_values` is True, `order_domain_values` returns an iterator
+        that orders values as they are taken, instead of a sorted list.
+        """
+        super().__init__(crossword)
+        self.mode = inference
+        self.strategy = search
+        self.random = random.Random(seed) if seed is not None else None
+        self.lazy_values = lazy_values
+
+        self.stats = stats if stats is not None else SolverStats()
+
+        # Node count at which the current search should give up and restart
+        # (None for no limit)
+        self.limit = None
+
+        # Each domain is a bitmask over the word ids of the variable's length
+        self.domains = {
+            var: self.crossword.all_words(var.length)
+            for var in self.crossword.variables
+        }
+
+        # Culprits of each variable: the assigned variables responsible for
+        # the values removed from its domain during search
+        self.culprits = {
+            var: frozenset()
+            for var in self.crossword.variables
+        }
+
+        # Trail of (table, key, previous value) entries, so that changes to
+        # domains, culprits and supports made during search can be undone
+        # when backtracking
+        self.trail = []
+
+        # Arc consistency engine, used both before and during search
+        self.consistency = ArcConsistency(self)
+
+        # Variable whose domain was last wiped out by inference
+        self.wiped = None
+
+        # Priority queue of unassigned variables, holding entries of the form
+        # (remaining values, -degree, -weight, tie-break, push count,
+        # version, variable). Only the entry matching a variable's current
+        # version is valid, and the rest are discarded when they surface.
+        self.degrees = {
+            var: len(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self.weights = dict.fromkeys(self.crossword.variables, 1)
+        self.versions = dict.fromkeys(self.crossword.variables, 0)
+        self.pushes = 0
+        self.queue = []
+        self.rebuild_queue()
+
+        # Letter counts at each overlap position: for any (var, k) where var
+        # overlaps a neighbor at its kth letter, the domain last counted and a
+        # dict mapping each letter to the number of its words with that letter
+        # there, along with the kth letter of every word of var's length
+        self.tallies = dict()
+        self.columns = dict()
+        for x, y in self.crossword.overlaps:
+            k = self.crossword.overlaps[x, y][0]
+            words = self.crossword.words.get(x.length)
+            self.columns[x.length, k] = words.column(k) if words else ""
+            counts = {
+                letter: (self.domains[x] & words).bit_count()
+                for letter, words in self.crossword.index[x.length, k].items()
+            }
+            self.tallies[x, k] = self.domains[x], counts
+
+        # Learned nogoods: sets of (variable, word) pairs that can never be
+        # part of a solution, indexed by each of their pairs
+        self.nogoods = dict()
+
+    def solve(self, restart=None):
         """
         Enforce node and arc consistency, and then solve the CSP.
+        If `restart` is given, search restarts from scratch whenever it
+        expands more than `restart` times the next term of the Luby sequence
+        in nodes, so that one bad early choice cannot stall it for long.
+        The domains are left as they were before solving.
+        """
+        start = len(self.trail)
+        try:
+            with self.stats.phase("node consistency"):
+                self.enforce_node_consistency()
+            with self.stats.phase("ac3"):
+                self.ac3()
+            if self.strategy == CrosswordCreator.BACKJUMP:
+                search = lambda: self.backjump(dict())[0]
+            else:
+                search = lambda: self.backtrack(dict())
+
+            with self.stats.phase("search"):
+                if restart is None:
+                    return search()
+
+                # Learned nogoods stay valid across restarts
+                mark = len(self.trail)
+                for run in itertools.count(1):
+                    self.limit = self.stats.nodes + restart * luby(run)
+                    try:
+                        return search()
+                    except Restart:
+                        self.stats.restarts += 1
+                        self.undo(mark)
+        finally:
+            self.undo(start)
+
+    def iter_solutions(self):
+        """
+        Enforce node and arc consistency, and then yield every complete
+        assignment for the crossword in turn. Each independent region of the
+        grid is searched on its own, and its solutions are combined with
+        those of the other regions.
         """
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        mark = len(self.trail)
+        try:
+            if self.ac3():
+                components = self.crossword.components()
+                for assignment in self.combine(components, dict()):
+                    yield dict(assignment)
+        finally:
+            self.undo(mark)
+
+    def count_solutions(self):
+        """
+        Enforce node and arc consistency, and then return the number of
+        complete assignments for the crossword. Each independent region of
+        the grid is counted on its own, and the counts are multiplied.
+        """
+        with self.stats.phase("node consistency"):
+            self.enforce_node_consistency()
+        mark = len(self.trail)
+        try:
+            with self.stats.phase("ac3"):
+                if not self.ac3():
+                    return 0
+            total = 1
+            with self.stats.phase("search"):
+                for component in self.crossword.components():
+                    total *= self.count(component, dict(), len(component))
+                    if total == 0:
+                        break
+            return total
+        finally:
+            self.undo(mark)
 
     def enforce_node_consistency(self):
         """
@@ -101,12 +257,81 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for var in self.crossword.variables:
-            failed_words = []
-            for word in self.domains[var]:
-                if len(word) != var.length:
-                    failed_words.append(word)
-            for word in failed_words:
-                self.domains[var].remove(word)
+            self.prune(var, self.crossword.all_words(var.length))
+
+    def prune(self, var, mask, cause=frozenset()):
+        """
+        Restrict the domain of `var` to the word ids in bitmask `mask`,
+        recording the previous domain on the trail. `cause` is the set of
+        assigned variables responsible for the removals.
+
+        Return True if the domain of `var` changed; return False otherwise.
+        """
+        domain = self.domains[var]
+        if domain & mask == domain:
+            return False
+        self.remember(self.domains, var)
+        self.domains[var] = domain & mask
+        self.touch(var)
+        if cause:
+            self.remember(self.culprits, var)
+            self.culprits[var] = self.culprits[var] | cause
+        return True
+
+    def remember(self, table, key):
+        """
+        Record the current value of `table[key]` (None if missing) on the
+        trail, before it is changed.
+        """
+        self.trail.append((table, key, table.get(key)))
+
+    def undo(self, mark):
+        """
+        Restore every value changed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            table, key, value = self.trail.pop()
+            table[key] = value
+            if table is self.domains:
+                self.touch(key)
+
+    def letter_counts(self, var, k):
+        """
+        Return dict mapping each letter to the number of words in the domain
+        of `var` with that letter as their `k`th character.
+        The counts are brought up to date by the words that have left or
+        rejoined the domain since they were last asked for, so only domains
+        that changed in between cost anything to count.
+        """
+        domain = self.domains[var]
+        counted, counts = self.tallies[var, k]
+        if counted == domain:
+            return counts
+        index = self.crossword.index[var.length, k]
+        column = self.columns[var.length, k]
+        removed = counted & ~domain
+        added = domain & ~counted
+
+        # Count the letters of the few words that changed one by one
+        if (removed | added).bit_count() < len(index):
+            for word in word_ids(removed):
+                counts[column[word]] -= 1
+            for word in word_ids(added):
+                counts[column[word]] += 1
+
+        # Or recount the few words that are left
+        elif domain.bit_count() < len(index):
+            counts.update(dict.fromkeys(counts, 0))
+            for word in word_ids(domain):
+                counts[column[word]] += 1
+
+        # Otherwise count the words having each letter at once
+        else:
+            for letter, words in index.items():
+                counts[letter] = (domain & words).bit_count()
+
+        self.tallies[var, k] = domain, counts
+        return counts
 
     def revise(self, x, y):
         """
@@ -117,25 +342,7 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        i,j = self.crossword.overlaps[x,y]
-        revised = False
-
-        for wordX in self.domains[x]:
-            combination = False
-            failed_words = []
-            for wordY in self.domains[y]:
-                if wordX[i] == wordY[j]:
-                    combination = True
-
-            if combination == False: 
-                failed_words.append(wordX)
-                revised = True
-            
-        for word in failed_words:
-            self.domains[x].remove(word)
-
-        return revised
-
+        return self.consistency.revise(x, y)
 
     def ac3(self, arcs=None):
         """
@@ -147,23 +354,7 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
 
-        #from week 3 sudo code "function AC-3(csp)"
-        if arcs == None:
-            arcs = [] 
-            for x in self.crossword.variables:
-                for y in self.crossword.neighbors(x):
-                    arcs.append((x,y)) 
-
-        while len(arcs) != 0:
-            x, y = arcs.pop()
-            if self.revise(x, y):
-                if len(self.domains[x]) == 0:
-                    return False
-                for neighbour_x in self.crossword.neighbors(x):
-                    if neighbour_x != y:
-                        arcs.append((neighbour_x, x))
-
-        return True
+        return self.consistency.propagate(arcs)
 
     def assignment_complete(self, assignment):
         """
@@ -174,11 +365,22 @@ class CrosswordCreator():
             return True
         return False
 
-    def consistent(self, assignment):
+    def consistent(self, assignment, var=None):
         """
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
+        If `var` is given, the rest of `assignment` is assumed consistent
+        already and only the overlaps of `var` are checked.
         """
+        if var is not None:
+            word = assignment[var]
+            for neighbor in self.crossword.neighbors(var):
+                if neighbor in assignment:
+                    i, j = self.crossword.overlaps[var, neighbor]
+                    if word[i] != assignment[neighbor][j]:
+                        return False
+            return True
+
         for word1 in assignment:
             for word2 in assignment:
                 if word1 != word2: 
@@ -190,6 +392,42 @@ class CrosswordCreator():
                             return False
         return True
 
+    def inference(self, var, assignment):
+        """
+        Propagate the assignment of `var`. The domain of `var` is reduced to
+        its assigned word, then, depending on the inference mode, either the
+        domain of each unassigned neighbor is forward checked against it, or
+        arc consistency is restored starting from the arcs into `var`.
+
+        Return False if some domain is left empty; return True otherwise.
+        """
+        word = assignment[var]
+
+        # Every other value of `var` is removed by this assignment alone
+        self.remember(self.domains, var)
+        self.remember(self.culprits, var)
+        self.domains[var] &= self.crossword.word_mask(word)
+        self.culprits[var] = frozenset([var])
+        self.touch(var)
+
+        if self.mode == CrosswordCreator.MAC:
+            arcs = [
+                (neighbor, var)
+                for neighbor in self.crossword.neighbors(var)
+                if neighbor not in assignment
+            ]
+            return self.ac3(arcs)
+
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor not in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                self.prune(neighbor, self.crossword.words_with(
+                    neighbor.length, j, word[i]
+                ), self.culprits[var])
+                if not self.domains[neighbor]:
+                    self.wipeout(neighbor, var)
+                    return False
+        return True
 
     def order_domain_values(self, var, assignment):
         """
@@ -197,52 +435,112 @@ class CrosswordCreator():
         the number of values they rule out for neighboring variables.
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
+        With `lazy_values` set, an iterator over the values in that order
+        is returned instead.
         """
-        conflicts = {}
-        for value in self.domains[var]:
-            num_conflicts = 0
-            for neighbor in self.crossword.neighbors(var):
-                if neighbor not in assignment:
-                    for neighbor_value in self.domains[neighbor]:
-                        if not self.crossword.overlaps[var, neighbor]:
-                            continue
-                        i, j = self.crossword.overlaps[var, neighbor]
-                        if value[i] != neighbor_value[j]:
-                            num_conflicts += 1
-            conflicts[value] = num_conflicts
+        # A value rules out every neighbor value without its letter at the
+        # overlap, which the neighbor's letter counts give directly
+        overlaps = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor not in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                size = self.domains[neighbor].bit_count()
+                counts = self.letter_counts(neighbor, j)
+                overlaps.append((i, size, counts))
+
+        def ruled_out(value):
+            return sum(
+                size - counts.get(value[i], 0)
+                for i, size, counts in overlaps
+            )
 
-        return sorted(self.domains[var], key=lambda value: conflicts[value])
+        key = ruled_out
+        if self.random is not None:
+            key = lambda value: (ruled_out(value), self.random.random())
 
-    def select_unassigned_variable(self, assignment):
+        values = self.crossword.words_in(var.length, self.domains[var])
+        if self.lazy_values:
+            return lazily_sorted(values, key)
+        return sorted(values, key=key)
+
+    def select_unassigned_variable(self, assignment, variables=None):
         """
         Return an unassigned variable not already part of `assignment`.
         Choose the variable with the minimum number of remaining values
         in its domain. If there is a tie, choose the variable with the highest
-        degree. If there is a tie, any of the tied variables are acceptable
-        return values.
+        degree. If there is a tie, choose the variable whose constraints have
+        caused the most domain wipe-outs so far (dom/wdeg). If there is still
+        a tie, any of the tied variables are acceptable return values.
+        If `variables` is given, choose only among those variables.
         """
-        unassigned_vars = []
+        if variables is not None:
+            unassigned_vars = [
+                var for var in variables if var not in assignment
+            ]
+            if not unassigned_vars:
+                return None
+            return min(unassigned_vars, key=self.priority)
+
+        # Discard entries for assigned variables or outdated priorities until
+        # the best current one is on top
+        for _ in range(2):
+            while self.queue:
+                *_, version, var = self.queue[0]
+                if var in assignment or version != self.versions[var]:
+                    heapq.heappop(self.queue)
+                else:
+                    return var
+            self.rebuild_queue()
+        return None
+
+    def priority(self, var):
+        """
+        Return sort key for choosing `var` next: remaining values, then
+        negated degree, then negated conflict weight, then a random tie-break
+        if seeded.
+        """
+        return (
+            self.domains[var].bit_count(),
+            -self.degrees[var],
+            -self.weights[var],
+            self.random.random() if self.random is not None else 0
+        )
+
+    def touch(self, var):
+        """
+        Queue `var` again after its domain or weight has changed, making any
+        earlier entries for it outdated.
+        """
+        self.versions[var] += 1
+        self.pushes += 1
+        heapq.heappush(
+            self.queue,
+            (*self.priority(var), self.pushes, self.versions[var], var)
+        )
+
+        # Outdated entries are dropped lazily; compact if they pile up
+        if len(self.queue) > 8 * len(self.versions) + 64:
+            self.rebuild_queue()
+
+    def rebuild_queue(self):
+        """Rebuild the variable queue with one current entry per variable."""
+        self.queue = []
         for var in self.crossword.variables:
-            if var not in assignment:
-                unassigned_vars.append(var)
-
-        min_remaining_values = math.inf
-        max_degree = -math.inf
-        selected_var = None
-
-        for var in unassigned_vars:
-            remaining_values = len(self.domains[var])
-            degree = len(self.crossword.neighbors(var))
-            if remaining_values < min_remaining_values:
-                min_remaining_values = remaining_values
-                max_degree = degree
-                selected_var = var
-            elif remaining_values == min_remaining_values and degree > max_degree:
-                min_remaining_values = remaining_values
-                max_degree = degree
-                selected_var = var
-
-        return selected_var 
+            self.pushes += 1
+            self.queue.append(
+                (*self.priority(var), self.pushes, self.versions[var], var)
+            )
+        heapq.heapify(self.queue)
+
+    def wipeout(self, x, y):
+        """
+        Note that revising `x` against `y` left the domain of `x` empty,
+        raising the conflict weight of both.
+        """
+        self.wiped = x
+        for var in (x, y):
+            self.weights[var] += 1
+            self.touch(var)
 
     def backtrack(self, assignment):
         """
@@ -252,36 +550,592 @@ class CrosswordCreator():
         `assignment` is a mapping from variables (keys) to words (values).
 
         If no assignment is possible, return None.
+        Raise Restart if the node limit for the current run is exceeded.
         """
+        self.stats.nodes += 1
+        if self.limit is not None and self.stats.nodes > self.limit:
+            raise Restart
+
         if self.assignment_complete(assignment):
             return assignment
         else:
             var = self.select_unassigned_variable(assignment)
+            self.stats.record_domain(self.domains[var].bit_count())
             for word in self.order_domain_values(var,assignment):
+                mark = len(self.trail)
                 assignment[var] = word
-                if self.consistent(assignment):
+                if (self.consistent(assignment, var)
+                        and self.inference(var, assignment)):
                     result = self.backtrack(assignment) 
                     if result is not None: 
                         return result
+                self.undo(mark)
                 assignment.pop(var)
+            self.stats.backtracks += 1
             return None
-                        
 
-def main():
+    def backjump(self, assignment):
+        """
+        Using Conflict-Directed Backjumping, take as input a partial
+        assignment for the crossword and return a tuple (result, conflict).
+
+        If a complete assignment is possible, `result` is that assignment.
+        Otherwise `result` is None and `conflict` is the set of assigned
+        variables whose values rule out every completion; search jumps
+        straight back to the most recently assigned of them, and their
+        values are learned as a nogood.
+        Raise Restart if the node limit for the current run is exceeded.
+        """
+        self.stats.nodes += 1
+        if self.limit is not None and self.stats.nodes > self.limit:
+            raise Restart
+
+        if self.assignment_complete(assignment):
+            return assignment, None
+
+        var = self.select_unassigned_variable(assignment)
+        self.stats.record_domain(self.domains[var].bit_count())
+
+        # Values already missing from the domain were removed because of
+        # the culprits of `var`, so they share the blame for its failure
+        conflict = set(self.culprits[var])
+
+        for word in self.order_domain_values(var, assignment):
+            mark = len(self.trail)
+            assignment[var] = word
+            cause = self.conflict(var, assignment)
+            if cause is None:
+                result, cause = self.backjump(assignment)
+                if result is not None:
+                    return result, None
+                if var not in cause:
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+                    # `var` played no part in the failure below it, so
+                    # trying its other values cannot help
+                    self.undo(mark)
+                    assignment.pop(var)
+                    self.stats.backjumps += 1
+                    return None, cause
+            conflict |= cause
+            self.undo(mark)
+            assignment.pop(var)
+
+        conflict.discard(var)
+        self.stats.backtracks += 1
+        self.learn(conflict, assignment)
+        return None, conflict
+
+    def conflict(self, var, assignment):
+        """
+        Check and propagate the newest assignment, of `var`, for `backjump`.
+        Return None if no conflict was found; otherwise, return the set of
+        assigned variables, including `var`, that are to blame.
+        """
+        word = assignment[var]
+
+        # A learned nogood rules out this assignment
+        for nogood in self.nogoods.get((var, word), []):
+            if all(assignment.get(v) == w for v, w in nogood):
+                self.stats.nogood_prunes += 1
+                return set(v for v, w in nogood)
+
+        # A word overlapping an assigned neighbor in a different letter
+        if not self.consistent(assignment, var):
+            return set([var]).union(
+                neighbor for neighbor in self.crossword.neighbors(var)
+                if neighbor in assignment
+            )
+
+        # Propagation wiped out some domain
+        if not self.inference(var, assignment):
+            return set([var]).union(self.culprits[self.wiped])
+
+        return None
+
+    def learn(self, conflict, assignment):
+        """
+        Record the values of the variables in `conflict` as a nogood.
+        """
+        if not conflict:
+            return
+        nogood = frozenset((var, assignment[var]) for var in conflict)
+        for pair in nogood:
+            self.nogoods.setdefault(pair, []).append(nogood)
+
+
+    def combine(self, components, assignment):
+        """
+        Yield `assignment`, extended in place, once for every combination of
+        solutions to the variables of each of `components`.
+        """
+        if not components:
+            yield assignment
+            return
+        for _ in self.extend(components[0], assignment):
+            yield from self.combine(components[1:], assignment)
+
+    def extend(self, variables, assignment):
+        """
+        Yield `assignment`, extended in place, once for every way of
+        consistently assigning all of `variables`.
+        """
+        self.stats.nodes += 1
+        var = self.select_unassigned_variable(assignment, variables)
+        if var is None:
+            yield assignment
+            return
+        self.stats.record_domain(self.domains[var].bit_count())
+        for word in self.crossword.words_in(var.length, self.domains[var]):
+            mark = len(self.trail)
+            assignment[var] = word
+            if (self.consistent(assignment, var)
+                    and self.inference(var, assignment)):
+                yield from self.extend(variables, assignment)
+            self.undo(mark)
+            assignment.pop(var)
+
+    def count(self, variables, assignment, remaining):
+        """
+        Return the number of ways of consistently assigning the `remaining`
+        unassigned variables among `variables`, given `assignment`.
+        """
+        self.stats.nodes += 1
+        var = self.select_unassigned_variable(assignment, variables)
+        self.stats.record_domain(self.domains[var].bit_count())
+
+        # Inference has already removed every value of the last variable
+        # that conflicts with an assigned neighbor
+        if remaining == 1:
+            return self.domains[var].bit_count()
+
+        total = 0
+        for word in self.crossword.words_in(var.length, self.domains[var]):
+            mark = len(self.trail)
+            assignment[var] = word
+            if (self.consistent(assignment, var)
+                    and self.inference(var, assignment)):
+                total += self.count(variables, assignment, remaining - 1)
+            self.undo(mark)
+            assignment.pop(var)
+        return total
+
+
+class ArcConsistency():
+
+    def __init__(self, creator):
+        """
+        Create new AC-2001 arc consistency engine for the domains of a
+        CrosswordCreator. Removals go through the creator's `prune`, and
+        support changes onto its trail, so both are undone on backtrack.
+        """
+        self.creator = creator
+        self.crossword = creator.crossword
+
+        # Last support found for each arc and letter: for any (x, y, letter),
+        # the id of a word in the domain of y that agrees with the words of
+        # x having `letter` at their overlap, and no word with a lower id
+        # does
+        self.supports = dict()
+
+    def revise(self, x, y):
+        """
+        Make variable `x` arc consistent with variable `y`, resuming the
+        search for each letter's support after the last one found.
+
+        Return True if a revision was made to the domain of `x`; return
+        False if no revision was made.
+        """
+        creator = self.creator
+        creator.stats.revise_calls += 1
+        i, j = self.crossword.overlaps[x, y]
+        domain_x = creator.domains[x]
+        domain_y = creator.domains[y]
+
+        # Words in `x` sharing a letter at the overlap stand or fall together,
+        # so look for support once per letter rather than once per word
+        supported = 0
+        for letter, words in self.crossword.index[x.length, i].items():
+            if not domain_x & words:
+                continue
+            key = x, y, letter
+            last = self.supports.get(key)
+            if last is not None and domain_y >> last & 1:
+                supported |= words
+                continue
+
+            # Words up to the last support are already gone from `y`
+            candidates = domain_y & self.crossword.words_with(
+                y.length, j, letter
+            )
+            if last is not None:
+                candidates = candidates >> (last + 1) << (last + 1)
+            if candidates:
+                lowest = candidates & -candidates
+                creator.remember(self.supports, key)
+                self.supports[key] = lowest.bit_length() - 1
+                supported |= words
+
+        # Values of `x` lost their support because of removals from `y`
+        return creator.prune(x, supported, creator.culprits[y])
+
+    def propagate(self, arcs=None):
+        """
+        Make every arc arc consistent, starting from `arcs`, or from all arcs
+        in the problem if `arcs` is None, and revisiting the arcs into any
+        variable whose domain shrinks. Pending arcs are kept in first-in,
+        first-out order, and an arc already pending is not added again.
+
+        Return True if arc consistency is enforced and no domains are empty;
+        return False if one or more domains end up empty.
+        """
+        creator = self.creator
+        if arcs is None:
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.crossword.neighbors(x)
+            ]
+        queue = collections.deque()
+        pending = set()
+        for arc in arcs:
+            if arc not in pending:
+                queue.append(arc)
+                pending.add(arc)
+
+        while queue:
+            x, y = queue.popleft()
+            pending.remove((x, y))
+            creator.stats.arcs_processed += 1
+            if self.revise(x, y):
+                if not creator.domains[x]:
+                    creator.wipeout(x, y)
+                    return False
+                for z in self.crossword.neighbors(x):
+                    if z != y and (z, x) not in pending:
+                        queue.append((z, x))
+                        pending.add((z, x))
+
+        return True
+
+
+class GlyphAtlas():
+
+    FONT = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "assets", "fonts", "OpenSans-Regular.ttf"
+    )
+
+    def __init__(self, cell_size, cell_border, font_size=80):
+        """
+        Create new atlas of white crossword cells, each with one letter
+        drawn in it, with the letters A to Z rendered up front.
+        """
+        from PIL import ImageFont
+        self.cell_size = cell_size
+        self.cell_border = cell_border
+        self.font = ImageFont.truetype(GlyphAtlas.FONT, font_size)
+        self.cells = {None: self.render(None)}
+        for c in range(ord("A"), ord("Z") + 1):
+            self.cells[chr(c)] = self.render(chr(c))
+
+    def render(self, letter):
+        """Return image of a white cell interior with `letter` drawn in it."""
+        from PIL import Image, ImageDraw
+        interior_size = self.cell_size - 2 * self.cell_border
+        size = (interior_size + 1, interior_size + 1)
+        cell = Image.new("RGBA", size, "white")
+        if letter:
+            draw = ImageDraw.Draw(cell)
+            _, _, w, h = draw.textbbox((0, 0), letter, font=self.font)
+            draw.text(
+                ((interior_size - w) / 2, (interior_size - h) / 2 - 10),
+                letter, fill="black", font=self.font
+            )
+        return cell
+
+    def cell(self, letter):
+        """
+        Return image of a white cell interior with `letter` drawn in it, or
+        a blank one if `letter` is None.
+        """
+        if letter not in self.cells:
+            self.cells[letter] = self.render(letter)
+        return self.cells[letter]
+
+
+@functools.lru_cache(maxsize=None)
+def glyph_atlas(cell_size, cell_border):
+    """Return the GlyphAtlas for a cell size, shared by every image."""
+    return GlyphAtlas(cell_size, cell_border)
+
+
+class SolverStats():
+
+    COUNTERS = [
+        "nodes", "backtracks", "backjumps", "nogood_prunes", "restarts",
+        "arcs_processed", "revise_calls"
+    ]
+
+    def __init__(self, timing=False):
+        """
+        Create new set of solver counters, all zero. If `timing` is True,
+        time spent in each solver phase is measured too.
+        """
+        self.timing = timing
+        for name in SolverStats.COUNTERS:
+            setattr(self, name, 0)
+
+        # Domain sizes of the variables chosen at each search node, counted
+        # by bit length (i.e., bucket k holds sizes from 2**(k-1) to 2**k-1)
+        self.domain_sizes = collections.Counter()
+
+        # Seconds spent in each phase
+        self.timers = collections.defaultdict(float)
+
+    def merge(self, other):
+        """Add the counters, histogram and timers of `other` to these."""
+        for name in SolverStats.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.domain_sizes.update(other.domain_sizes)
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+
+    def record_domain(self, size):
+        """Count a search node choosing a variable with `size` values."""
+        self.domain_sizes[size.bit_length()] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager adding time spent inside it to phase `name`."""
+        if not self.timing:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def histogram(self):
+        """
+        Return dict mapping domain size ranges, such as "4-7", to the number
+        of search nodes whose chosen variable had that many values.
+        """
+        histogram = dict()
+        for k in sorted(self.domain_sizes):
+            low, high = (1 << k) >> 1, (1 << k) - 1
+            label = str(low) if low == high else f"{low}-{high}"
+            histogram[label] = self.domain_sizes[k]
+        return histogram
+
+    def as_dict(self):
+        """Return the counters, histogram and timers as a plain dict."""
+        stats = {name: getattr(self, name) for name in SolverStats.COUNTERS}
+        stats["domain_sizes"] = self.histogram()
+        if self.timing:
+            stats["seconds"] = dict(self.timers)
+        return stats
+
+    def print(self):
+        """Print the counters, histogram and timers to the terminal."""
+        for name in SolverStats.COUNTERS:
+            print(f"{name.replace('_', ' ')}: {getattr(self, name)}")
+        print("domain sizes at search nodes:")
+        for label, count in self.histogram().items():
+            print(f"  {label}: {count}")
+        if self.timing:
+            for name, seconds in self.timers.items():
+                print(f"{name} time: {seconds:.4f}s")
+
+
+def word_ids(mask):
+    """Yield the ids set in a bitmask of word ids, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def lazily_sorted(values, key):
+    """
+    Yield `values` in order by `key`, sorting only as far as they are taken.
+    """
+    heap = [(key(value), k, value) for k, value in enumerate(values)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[-1]
+
+
+class Restart(Exception):
+    """Raised when a search run exceeds its node limit."""
+
+
+def luby(i):
+    """
+    Return the `i`th term (counting from 1) of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+def solve_seeded(job):
+    """
+    Solve a (crossword, inference, search, seed, restart, timing,
+    lazy_values) job, with randomized tie-breaking from `seed` and restarts
+    every `restart` Luby nodes, and return the result along with the
+    solver's SolverStats, timing phases if `timing` is True.
+    """
+    crossword, inference, search, seed, restart, timing, lazy_values = job
+    creator = CrosswordCreator(
+        crossword, inference=inference, search=search, seed=seed,
+        stats=SolverStats(timing=timing), lazy_values=lazy_values
+    )
+    return creator.solve(restart=restart), creator.stats
+
+
+def race_seeded(job, connection):
+    """
+    Solve a job as `solve_seeded` does, and send what it returns (or the
+    exception it raises) down `connection`.
+    """
+    try:
+        result = solve_seeded(job)
+    except Exception as e:
+        result = e
+    connection.send(result)
+
+
+def solve_portfolio(crossword, workers, inference=CrosswordCreator.MAC,
+                    search=CrosswordCreator.CHRONOLOGICAL, restart=100,
+                    stats=None, lazy_values=False):
+    """
+    Solve `crossword` with `workers` differently seeded solvers running in
+    parallel processes, returning the result of whichever finishes first.
+    The other solvers are terminated as soon as one result is in. If
+    `stats` is given, the winning solver's counters are added to it.
+    """
+    timing = stats is not None and stats.timing
+    solvers = []
+    senders = []
+    waiting = []
+    for seed in range(workers):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        job = (
+            crossword, inference, search, seed, restart, timing, lazy_values
+        )
+        solvers.append(
+            multiprocessing.Process(target=race_seeded, args=(job, sender))
+        )
+        senders.append(sender)
+        waiting.append(receiver)
+
+    # Every seeded search is complete, so whichever finishes first has the
+    # answer. Each solver is a process of its own rather than a pool worker,
+    # since terminating a pool while it is handing out jobs can hang.
+    try:
+        for solver, sender in zip(solvers, senders):
+            solver.start()
+
+            # Only the solver writes to its pipe, so that the pipe reports
+            # end of file if the solver exits without writing
+            sender.close()
+        result = None
+        while result is None and waiting:
+            for connection in multiprocessing.connection.wait(waiting):
+                try:
+                    result = connection.recv()
+                    break
+                except EOFError:
+
+                    # The solver exited without sending a result
+                    waiting.remove(connection)
+    finally:
+        started = [solver for solver in solvers if solver.pid is not None]
+        for solver in started:
+            solver.terminate()
+        for solver in started:
+            solver.join()
+
+    if result is None:
+        raise RuntimeError("every solver exited without a result")
+    if isinstance(result, Exception):
+        raise result
+    assignment, winner = result
+    if stats is not None:
+        stats.merge(winner)
+    return assignment
+
+
+def main():
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    parser = argparse.ArgumentParser(
+        usage="python generate.py structure words [output]"
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument(
+        "--inference", default=CrosswordCreator.MAC,
+        choices=[CrosswordCreator.FORWARD, CrosswordCreator.MAC],
+        help="propagation after each assignment (default: mac)"
+    )
+    parser.add_argument(
+        "--search", default=CrosswordCreator.CHRONOLOGICAL,
+        choices=[CrosswordCreator.CHRONOLOGICAL, CrosswordCreator.BACKJUMP],
+        help="search strategy (default: chronological)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of randomized solvers to race in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--lazy-values", action="store_true",
+        help="order each domain lazily instead of sorting it in full"
+    )
+    parser.add_argument(
+        "--count", action="store_true",
+        help="print the number of solutions instead of one solution"
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="print solver counters and phase timings (of the winning "
+             "solver, with --workers)"
+    )
+    args = parser.parse_args()
+    structure = args.structure
+    words = args.words
+    output = args.output
 
     # Generate crossword
     crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    stats = SolverStats(timing=args.stats)
+    if args.workers > 1 and not args.count:
+
+        # The workers each set up a solver of their own, so only printing
+        # is left for this process
+        creator = CrosswordPrinter(crossword)
+        assignment = solve_portfolio(
+            crossword, args.workers,
+            inference=args.inference, search=args.search, stats=stats,
+            lazy_values=args.lazy_values
+        )
+    else:
+        creator = CrosswordCreator(
+            crossword, inference=args.inference, search=args.search,
+            stats=stats, lazy_values=args.lazy_values
+        )
+        if args.count:
+            print(creator.count_solutions())
+            if args.stats:
+                stats.print()
+            return
+        assignment = creator.solve()
 
     # Print result
     if assignment is None:
@@ -290,6 +1144,8 @@ def main():
         creator.print(assignment)
         if output:
             creator.save(assignment, output)
+    if args.stats:
+        stats.print()
 
 
 if __name__ == "__main__":
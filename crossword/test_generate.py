@@ -0,0 +1,17 @@
+from crossword import Crossword
+from generate import CrosswordCreator
+
+
+def creator(search=CrosswordCreator.CHRONOLOGICAL):
+    crossword = Crossword("data/structure0.txt", "data/words1.txt")
+    return CrosswordCreator(crossword, search=search)
+
+
+def test_solving_leaves_domains_for_counting():
+    for search in [CrosswordCreator.CHRONOLOGICAL, CrosswordCreator.BACKJUMP]:
+        fresh = creator(search).count_solutions()
+        solved = creator(search)
+        assert solved.solve() is not None
+        assert solved.solve(restart=1) is not None
+        assert solved.count_solutions() == fresh
+        assert len(list(solved.iter_solutions())) == fresh
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"CROSSWD1"
+
+
+class WordBucket():
+
+    def __init__(self, data, offset, count, length):
+        """
+        Create a view of `count` words of `length` letters each, stored back
+        to back as ASCII in `data` starting at `offset`.
+        """
+        self.data = data
+        self.offset = offset
+        self.count = count
+        self.length = length
+
+        # Letter masks of each position, built on first use
+        self.masks = dict()
+
+    def __len__(self):
+        return self.count
+
+    def __reduce__(self):
+        # Memory maps cannot be pickled, so send a copy of just these words
+        end = self.offset + self.count * self.length
+        data = bytes(self.data[self.offset:end])
+        return (
+            WordBucket, (data, 0, self.count, self.length),
+            {"masks": self.masks}
+        )
+
+    def __getitem__(self, k):
+        if not 0 <= k < self.count:
+            raise IndexError("word id out of range")
+        start = self.offset + k * self.length
+        return self.data[start:start + self.length].decode("ascii")
+
+    def column(self, k):
+        """Return string of the `k`th letter of each word, in word id order."""
+        end = self.offset + self.count * self.length
+        return self.data[self.offset + k:end:self.length].decode("ascii")
+
+    def letter_masks(self, k):
+        """
+        Return dict mapping each letter to a bitmask of the ids of the words
+        whose `k`th character is that letter.
+        """
+        if k not in self.masks:
+            self.masks[k] = letter_masks(self.column(k))
+        return self.masks[k]
+
+
+# Vocabularies already loaded by this process, by absolute path
+loaded = dict()
+
+
+def load(words_file):
+    """
+    Load the vocabulary in `words_file` as a dict mapping each word length to
+    a WordBucket of the upper-cased words of that length, in sorted order.
+
+    The vocabulary is compiled once into a cache file next to `words_file`,
+    and later loads memory-map that file instead of parsing the word list.
+    The cache is rebuilt whenever the source file's contents change. Words
+    that are not plain ASCII are left out.
+
+    Within a process, loading the same unchanged file again returns the same
+    buckets, along with any letter masks already built for them.
+    """
+    stat = os.stat(words_file)
+    key = os.path.abspath(words_file)
+    if key in loaded:
+        (size, mtime_ns), words = loaded[key]
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+            return words
+    words = read_words(words_file, stat)
+    loaded[key] = (stat.st_size, stat.st_mtime_ns), words
+    return words
+
+
+def read_words(words_file, stat):
+    """
+    Return the buckets of `words_file`, whose `os.stat` result is `stat`,
+    from its cache file, compiling the cache first if it is stale.
+    """
+    cache_file = words_file + ".cache"
+
+    # Use the cache if its recorded size and mtime (or failing that, hash)
+    # still match the source file
+    cached = read_cache(cache_file)
+    if cached is not None:
+        header, data = cached
+        if (header["size"] == stat.st_size
+                and header["mtime_ns"] == stat.st_mtime_ns):
+            return buckets(header, data)
+        if header["sha256"] == file_hash(words_file):
+
+            # Record the new size and mtime, so later loads need not hash
+            # the source file again
+            try:
+                refresh_cache(cache_file, header, data, stat)
+            except OSError:
+                pass
+            return buckets(header, data)
+
+    # Otherwise compile the word list, and save it for next time if possible
+    header, data = compile_words(words_file, stat)
+    try:
+        write_cache(cache_file, header, data)
+    except OSError:
+        pass
+    return buckets(header, data)
+
+
+def compile_words(words_file, stat):
+    """
+    Read `words_file` and return (header, data), where data holds each length
+    bucket's sorted words back to back and header records where each bucket
+    starts along with the size, mtime and hash of the source file.
+    """
+    with open(words_file, "rb") as f:
+        contents = f.read()
+    words = set(contents.decode().upper().splitlines())
+
+    by_length = dict()
+    for word in words:
+        if word and word.isascii():
+            by_length.setdefault(len(word), []).append(word)
+
+    chunks = []
+    table = dict()
+    offset = 0
+    for length in sorted(by_length):
+        bucket = sorted(by_length[length])
+        table[str(length)] = [offset, len(bucket)]
+        chunks.append("".join(bucket).encode("ascii"))
+        offset += length * len(bucket)
+
+    header = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(contents).hexdigest(),
+        "buckets": table
+    }
+    return header, b"".join(chunks)
+
+
+def buckets(header, data):
+    """Return dict mapping each word length to its WordBucket in `data`."""
+    return {
+        int(length): WordBucket(data, offset, count, int(length))
+        for length, (offset, count) in header["buckets"].items()
+    }
+
+
+def read_cache(cache_file):
+    """
+    Return (header, data) for a cache file, with data memory-mapped, or None
+    if the cache file is missing or unreadable.
+    """
+    try:
+        with open(cache_file, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size))
+            start = len(MAGIC) + 4 + size
+            if os.fstat(f.fileno()).st_size == start:
+                return header, b""
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    # Shift bucket offsets to be relative to the start of the mapping
+    for bucket in header["buckets"].values():
+        bucket[0] += start
+    return header, data
+
+
+def write_cache(cache_file, header, data):
+    """Write header and data to a cache file, replacing it atomically."""
+    encoded = json.dumps(header).encode()
+    temporary = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(data)
+    os.replace(temporary, cache_file)
+
+
+def refresh_cache(cache_file, header, data, stat):
+    """
+    Rewrite a cache file read by `read_cache`, whose words are unchanged, to
+    record the size and mtime of the source file from its `os.stat` result
+    `stat`.
+    """
+    # Bucket offsets were shifted past the header when the cache was read
+    start = len(data) - sum(
+        int(length) * count
+        for length, (offset, count) in header["buckets"].items()
+    )
+    header = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": header["sha256"],
+        "buckets": {
+            length: [offset - start, count]
+            for length, (offset, count) in header["buckets"].items()
+        }
+    }
+    write_cache(cache_file, header, data[start:])
+
+
+def file_hash(filename):
+    """Return SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def letter_masks(column):
+    """
+    Given a string whose kth character is a letter of word k, return a dict
+    mapping each letter to a bitmask of the word ids having that letter.
+    """
+    # Build each bitmask from a string of binary digits, most significant
+    # (last word) first, so the work is done by str.translate and int
+    reverse = column[::-1]
+    letters = set(column)
+    masks = dict()
+    for letter in letters:
+        table = dict.fromkeys(map(ord, letters), "0")
+        table[ord(letter)] = "1"
+        masks[letter] = int(reverse.translate(table), 2)
+    return masks
@@ -0,0 +1,320 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from heredity import PROBS, infer_family, load_data, split_families
+from inference import Pedigree
+from synthesize import synthesize, write_data
+
+METHODS = ["elimination", "batched", "enumeration", "gibbs", "lw"]
+
+# Largest family each exhaustive method is run on, since their cost
+# grows exponentially with family size
+LIMITS = {"enumeration": 8, "batched": 12}
+
+# Methods that estimate marginals rather than computing them exactly
+SAMPLING = ["gibbs", "lw"]
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py {scaling,updates} [options]"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    updates = commands.add_parser(
+        "updates",
+        help="time updating posteriors after one new observation against "
+             "recomputing them all"
+    )
+    updates.add_argument(
+        "--template", default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "data", "family2.csv"
+        ),
+        help="family to scale up by chaining copies (default: family2.csv)"
+    )
+    updates.add_argument(
+        "--copies", type=int, nargs="+", default=[1, 10, 100, 1000],
+        help="numbers of chained copies to time (default: 1 10 100 1000)"
+    )
+    updates.add_argument(
+        "--updates", type=int, default=20,
+        help="observations to time per pedigree (default: 20)"
+    )
+    updates.add_argument(
+        "--seed", type=int, default=0,
+        help="seed for choosing observations (default: 0)"
+    )
+    scaling = commands.add_parser(
+        "scaling",
+        help="time every inference method on synthetic pedigrees of "
+             "increasing size, and check they agree"
+    )
+    scaling.add_argument("report", nargs="?", default="benchmark.json")
+    scaling.add_argument(
+        "--sizes", type=int, nargs="+", default=[8, 12, 40, 200, 1000],
+        help="numbers of people (default: 8 12 40 200 1000)"
+    )
+    scaling.add_argument(
+        "--methods", nargs="+", choices=METHODS, default=METHODS,
+        help="inference methods to time (default: all)"
+    )
+    scaling.add_argument(
+        "--depth", type=int, default=4,
+        help="generations per pedigree (default: 4)"
+    )
+    scaling.add_argument(
+        "--founders", type=float, default=0.4,
+        help="fraction of people without parents (default: 0.4)"
+    )
+    scaling.add_argument(
+        "--observed", type=float, default=0.5,
+        help="fraction of people whose trait is known (default: 0.5)"
+    )
+    scaling.add_argument(
+        "--consanguinity", type=float, default=0.0,
+        help="chance a couple are both from the family (default: 0)"
+    )
+    scaling.add_argument(
+        "--samples", type=int, default=20000,
+        help="most samples per chain for sampling methods (default: 20000)"
+    )
+    scaling.add_argument(
+        "--tolerance", type=float, default=0.05,
+        help="largest difference from the exact marginals allowed of "
+             "sampling methods; exact methods must agree to 1e-9 "
+             "(default: 0.05)"
+    )
+    scaling.add_argument(
+        "--timeout", type=float, default=300,
+        help="seconds before giving up on a run (default: 300)"
+    )
+    scaling.add_argument(
+        "--seed", type=int, default=0,
+        help="seed for pedigrees and sampling (default: 0)"
+    )
+    args = parser.parse_args()
+
+    if args.command == "scaling":
+        runs = []
+        rng = random.Random(args.seed)
+        with tempfile.TemporaryDirectory() as directory:
+            for size in args.sizes:
+                data = os.path.join(directory, f"pedigree{size}.csv")
+                write_data(synthesize(
+                    size, depth=args.depth, founders=args.founders,
+                    observed=args.observed,
+                    consanguinity=args.consanguinity, rng=rng
+                ), data)
+                runs.extend(time_methods(data, args))
+
+        report = {
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "tolerance": args.tolerance,
+            "runs": runs
+        }
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+        for run in runs:
+            difference = run.get("difference")
+            difference = "" if difference is None else f"{difference:.2e}"
+            memory = run.get("peak_memory_mb")
+            memory = "" if memory is None else f"{memory:.1f}MB"
+            agrees = {True: "agrees", False: "DISAGREES"}.get(
+                run.get("agrees"), ""
+            )
+            print(
+                f"{run['people']:>6} {run['method']:<12} "
+                f"{run['status']:<10} {run.get('seconds', 0):>9.4f}s "
+                f"{memory:>9} {difference:>9} {agrees}"
+            )
+        print(f"Report written to {args.report}")
+
+    elif args.command == "updates":
+        template = load_data(args.template)
+        rng = random.Random(args.seed)
+        print(
+            f"{'people':>7} {'recompute':>11} {'update all':>11} "
+            f"{'update one':>11}"
+        )
+        for copies in args.copies:
+            people = chain_copies(template, copies)
+            full, everyone, one = time_updates(people, args.updates, rng)
+            print(
+                f"{len(people):>7} {full * 1000:>9.2f}ms "
+                f"{everyone * 1000:>9.2f}ms {one * 1000:>9.2f}ms"
+            )
+
+
+def time_methods(data, args):
+    """
+    Run each method in `args` on the pedigree in file `data`, each in a
+    process of its own so its peak memory can be measured and it can be
+    stopped after the timeout, and return a list of dicts describing each
+    run, including how far its marginals are from the exact ones.
+    """
+    people = load_data(data)
+    largest = max(len(family) for family in split_families(people))
+    runs = []
+    exact = None
+    for method in args.methods:
+        run = {"people": len(people), "largest_family": largest,
+               "method": method}
+        runs.append(run)
+        if largest > LIMITS.get(method, largest):
+            run["status"] = "skipped"
+            continue
+
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        options = {
+            "chains": 4, "samples": args.samples, "seed": args.seed
+        }
+        process = multiprocessing.Process(
+            target=run_method, args=(data, method, options, sender)
+        )
+        process.start()
+        sender.close()
+        if not receiver.poll(args.timeout):
+            process.terminate()
+            process.join()
+            run["status"] = "timeout"
+            continue
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = {"status": "error", "error": "process died"}
+        process.join()
+
+        probabilities = result.pop("probabilities", None)
+        run.update(result)
+        if probabilities is None:
+            continue
+        if exact is None and method not in SAMPLING:
+            exact = probabilities
+        if exact is not None:
+            run["difference"] = difference(exact, probabilities)
+            tolerance = args.tolerance if method in SAMPLING else 1e-9
+            run["agrees"] = run["difference"] <= tolerance
+    return runs
+
+
+def run_method(data, method, options, sender):
+    """
+    Infer marginals of pedigree file `data` by `method`, one family at a
+    time, and send a dict with the marginals, the time taken and the peak
+    memory of this process and any it started.
+    """
+    try:
+        start = time.perf_counter()
+        people = load_data(data)
+        probabilities = dict()
+        for family in split_families(people):
+            probabilities.update(
+                infer_family((family, method, PROBS, options))
+            )
+        seconds = time.perf_counter() - start
+
+        # Peak resident set sizes are in kilobytes on Linux
+        peak = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        )
+        sender.send({
+            "status": "done",
+            "seconds": seconds,
+            "peak_memory_mb": peak / 1024,
+            "probabilities": probabilities
+        })
+    except Exception as e:
+        sender.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def difference(expected, actual):
+    """Return largest difference between two sets of marginals."""
+    return max(
+        abs(expected[person][field][value] - actual[person][field][value])
+        for person in expected
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+
+
+def chain_copies(template, copies):
+    """
+    Return pedigree, in the format of `load_data`, of `copies` copies of
+    the `template` pedigree, each of whose first founder is replaced by the
+    last person in the copy before, so that the copies form one family
+    many generations deep.
+    """
+    founders = [
+        person for person in template
+        if template[person]["mother"] is None
+        and template[person]["father"] is None
+    ]
+    last = list(template)[-1]
+
+    people = dict()
+    for k in range(copies):
+
+        def rename(person):
+            if person is None:
+                return None
+            if k > 0 and person == founders[0]:
+                return f"{last}-{k - 1}"
+            return f"{person}-{k}"
+
+        for person in template:
+            if k > 0 and person == founders[0]:
+                continue
+            name = rename(person)
+            people[name] = {
+                "name": name,
+                "mother": rename(template[person]["mother"]),
+                "father": rename(template[person]["father"]),
+                "trait": template[person]["trait"]
+            }
+    return people
+
+
+def time_updates(people, updates, rng):
+    """
+    Return mean seconds to compute everyone's posteriors from scratch, and
+    to bring them up to date after one observation or retraction, for
+    everyone and for one other person chosen at random.
+    """
+    start = time.perf_counter()
+    pedigree = Pedigree(people, PROBS)
+    pedigree.marginals()
+    full = time.perf_counter() - start
+
+    names = list(people)
+    everyone = []
+    one = []
+    for k in range(updates):
+        for times, query in [(everyone, None), (one, rng.choice(names))]:
+            person = rng.choice(names)
+            start = time.perf_counter()
+            if rng.random() < 0.25:
+                pedigree.retract(person)
+            else:
+                pedigree.observe(person, rng.random() < 0.5)
+            if query is None:
+                pedigree.marginals()
+            else:
+                pedigree.marginal(query)
+            times.append(time.perf_counter() - start)
+    return full, statistics.mean(everyone), statistics.mean(one)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import copy
+import functools
+
+GENES = (0, 1, 2)
+
+
+class Tables():
+
+    def __init__(self, prior, inheritance, trait):
+        """
+        Hold the probability tables of a model of gene inheritance:
+        `prior[g]` is the probability a person without parents has `g`
+        copies of the gene, `inheritance[g][m][f]` the probability a child
+        has `g` copies given their mother has `m` and father `f`, and
+        `trait[g][t]` the probability of trait `t` (False or True, so 0 or 1)
+        given `g` copies.
+        """
+        self.prior = prior
+        self.inheritance = inheritance
+        self.trait = trait
+
+
+# Tables by the id of the dict they were last looked up for, along with a
+# copy of that dict, so that changing it in place rebuilds them
+looked_up = dict()
+
+
+def tables(probs):
+    """
+    Return the Tables for a dict of probabilities in the format of
+    heredity.PROBS, built once for each distinct set of values.
+    """
+    if id(probs) in looked_up:
+        snapshot, result = looked_up[id(probs)]
+        if snapshot == probs:
+            return result
+    result = compile_tables(freeze(probs))
+    looked_up[id(probs)] = copy.deepcopy(probs), result
+    return result
+
+
+def freeze(value):
+    """Return nested dicts as nested tuples of sorted items, to hash them."""
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (key, freeze(item)) for key, item in value.items()
+        ))
+    return value
+
+
+def thaw(value):
+    """Return nested dicts from nested tuples made by `freeze`."""
+    if isinstance(value, tuple):
+        return {key: thaw(item) for key, item in value}
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def compile_tables(frozen):
+    """Return the Tables for probabilities frozen by `freeze`."""
+    probs = thaw(frozen)
+
+    # Each parent passes on one of their two copies, which may mutate
+    mutation = probs["mutation"]
+    passes = {0: mutation, 1: 0.5, 2: 1 - mutation}
+
+    def inheritance(g, m, f):
+        m, f = passes[m], passes[f]
+        if g == 2:
+            return m * f
+        if g == 1:
+            return m * (1 - f) + (1 - m) * f
+        return (1 - m) * (1 - f)
+
+    return Tables(
+        prior=tuple(probs["gene"][g] for g in GENES),
+        inheritance=tuple(
+            tuple(
+                tuple(inheritance(g, m, f) for f in GENES)
+                for m in GENES
+            )
+            for g in GENES
+        ),
+        trait=tuple(
+            (probs["trait"][g][False], probs["trait"][g][True])
+            for g in GENES
+        )
+    )
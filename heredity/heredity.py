@@ -1,7 +1,14 @@
+import argparse
 import csv
 import itertools
+import multiprocessing
 import sys
 
+import cpt
+import inference
+import sampling
+import vectorized
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -40,11 +47,126 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(usage="python heredity.py data.csv")
+    parser.add_argument("data")
+    parser.add_argument(
+        "--method", default="elimination",
+        choices=["elimination", "enumeration", "batched", "gibbs", "lw"],
+        help="exact inference by junction tree over a min-fill elimination "
+             "order, by enumerating every assignment, or by enumerating "
+             "them in NumPy batches; or approximate inference by Gibbs "
+             "sampling or likelihood weighting (default: elimination)"
+    )
+    parser.add_argument(
+        "--mutation", type=float, default=PROBS["mutation"],
+        help="probability that a copy of the gene mutates when passed on "
+             f"(default: {PROBS['mutation']})"
+    )
+    parser.add_argument(
+        "--chains", type=int, default=4,
+        help="sampling chains, each run in its own process (default: 4)"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=100000,
+        help="most samples per chain, if the chains have not yet converged "
+             "(default: 100000)"
+    )
+    parser.add_argument(
+        "--seed", type=int,
+        help="seed for sampling (default: random)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes inferring unrelated families in parallel, for exact "
+             "methods (default: 1)"
+    )
+    args = parser.parse_args()
+    people = load_data(args.data)
+    probs = dict(PROBS, mutation=args.mutation)
+
+    # Infer each family on its own, since unrelated people are independent
+    options = {
+        "chains": args.chains, "samples": args.samples, "seed": args.seed
+    }
+    jobs = [
+        (family, args.method, probs, options)
+        for family in split_families(people)
+    ]
+    probabilities = dict()
+    if args.workers > 1 and args.method not in ["gibbs", "lw"]:
+        with multiprocessing.Pool(args.workers) as pool:
+            for result in pool.imap_unordered(infer_family, jobs):
+                probabilities.update(result)
+    else:
+        for job in jobs:
+            probabilities.update(infer_family(job))
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def infer_family(job):
+    """
+    Return marginals of everyone in a family, given (family, method, probs,
+    options), where options holds the sampling settings.
+    Sampling methods run their chains in a pool of their own.
+    """
+    family, method, probs, options = job
+    if method == "elimination":
+        return inference.marginals(family, probs)
+    if method == "batched":
+        return vectorized.marginals(family, probs)
+    if method in ["gibbs", "lw"]:
+        return sampling.marginals(
+            family, probs, method=method, report=report_progress, **options
+        )
+    return enumerate_marginals(family, probs)
+
+
+# Running marginals of each person at the last block reported, along with
+# how many samples per chain they were estimated from
+reported = dict()
+
+
+def report_progress(samples, probabilities, rhat, ess):
+    """
+    Print convergence diagnostics of a sampling run to standard error,
+    along with the largest change in any running marginal since the
+    previous block.
+    """
+    change, where = None, None
+    for person in probabilities:
+        taken, previous = reported.get(person, (None, None))
+        if taken is None or taken >= samples:
+            continue
+        for field in probabilities[person]:
+            for value, p in probabilities[person][field].items():
+                delta = abs(p - previous[field][value])
+                if change is None or delta > change:
+                    change, where = delta, f"{person} {field} {value}"
+    for person in probabilities:
+        reported[person] = (samples, probabilities[person])
+
+    rhat = "n/a" if rhat is None else f"{rhat:.4f}"
+    change = "n/a" if change is None else f"{change:.4f} ({where})"
+    print(
+        f"{samples} samples per chain: R-hat {rhat}, ESS {ess:.0f}, "
+        f"largest change {change}",
+        file=sys.stderr
+    )
 
 
+def enumerate_marginals(people, probs=PROBS):
+    """
+    Return dict mapping each person to their "gene" and "trait" distributions
+    by summing the joint probability of every possible assignment.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -79,20 +201,14 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                p = joint_probability(
+                    people, one_gene, two_genes, have_trait, probs
+                )
                 update(probabilities, one_gene, two_genes, have_trait, p)
             
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -117,6 +233,39 @@ def load_data(filename):
     return data
 
 
+def split_families(people):
+    """
+    Return list of dicts in the format of `load_data`, one for each family:
+    each set of people linked by mother or father, however distantly.
+    """
+    relatives = {person: set() for person in people}
+    for person in people:
+        for parent in [people[person]["mother"], people[person]["father"]]:
+            if parent is not None:
+                relatives[person].add(parent)
+                relatives[parent].add(person)
+
+    families = []
+    seen = set()
+    for person in people:
+        if person in seen:
+            continue
+        family = set()
+        frontier = [person]
+        seen.add(person)
+        while frontier:
+            relative = frontier.pop()
+            family.add(relative)
+            for other in relatives[relative]:
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append(other)
+        families.append({
+            name: people[name] for name in people if name in family
+        })
+    return families
+
+
 def powerset(s):
     """
     Return a list of all possible subsets of set s.
@@ -129,7 +278,7 @@ def powerset(s):
     ]
 
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait, probs=PROBS):
     """
     Compute and return a joint probability.
 
@@ -140,75 +289,28 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    tables = cpt.tables(probs)
 
-    probability = 0
-    joint_probability = 1
+    genes = {
+        person: 2 if person in two_genes else 1 if person in one_gene else 0
+        for person in people
+    }
 
+    joint_probability = 1
     for person in people:
-        if person in one_gene: gene_number = 1
-        elif person in two_genes: gene_number = 2
-        else: gene_number = 0
-
-        if person in have_trait: trait = True
-        else: trait = False
-
-        #do they have parents?
-        if (people[person]['mother'] == None) and (people[person]['father'] == None):
-            probability = PROBS['trait'][gene_number][trait] * PROBS['gene'][gene_number]
-
-        else: #CONDITIONAL PROBABILITY (HAS PARENTS) & MUTATIONS 
-            #find both parents number of genes
-            mom_genes = -1
-            dad_genes = -1
-
-            if people[person]['mother'] in one_gene: mom_genes = 1
-            elif people[person]['mother'] in two_genes: mom_genes = 2
-            else: mom_genes = 0
-
-            if people[person]['father'] in one_gene: dad_genes = 1
-            elif people[person]['father'] in two_genes: dad_genes = 2
-            else: dad_genes = 0
-
-            #base probabilities:
-            event_one = 0
-            event_two = 0
-
-            # 1) dad had zero genes P(don't) = 99%   
-            if(dad_genes == 0): 
-                event_one = 0.99
-            # 2) dad had 1 gene P(don't) = 50%  (equal chance mutate both ways so it is equal) 
-            elif(dad_genes == 1):
-                event_one = 0.5
-            # 3) dad had 2 P(don't) = 1% mutation 
-            else:
-                event_one = 0.01
-
-            #opposite probabilities of dad for mom:
-            if(mom_genes == 0):
-                event_two = 0.01
-            elif(mom_genes == 1):
-                event_two = 0.5
-            else:
-                event_two = 0.99      
-
-            #TRAIT CHANCE
-            trait_chance = 0
-            trait_chance = PROBS["trait"][gene_number][trait]
-            
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        gene_number = genes[person]
 
-            #find probability based on parent combination
-            if person in one_gene: 
-                probability = ((event_one * event_two) + ((1-event_one) * (1-event_two))) * trait_chance #last part represents the OPPOSITE events happening since P(A) + P(Not A) = 1
-            elif person in two_genes: 
-                #dad did & mom did
-                probability = (1-event_one) * event_two * trait_chance
-            else: 
-                #both didn't
-                probability = (event_one) * (1-event_two) * trait_chance
+        # Gene prior if they have no parents, otherwise the inheritance CPT
+        if mother is None and father is None:
+            joint_probability *= tables.prior[gene_number]
+        else:
+            joint_probability *= (
+                tables.inheritance[gene_number][genes[mother]][genes[father]]
+            )
 
-        
-        joint_probability *= probability
-        probability = 0
+        joint_probability *= tables.trait[gene_number][person in have_trait]
 
     return joint_probability
 
@@ -0,0 +1,400 @@
+import heapq
+import itertools
+
+import cpt
+from cpt import GENES
+
+
+class Factor():
+
+    def __init__(self, variables, table):
+        """
+        Create a factor over a tuple of `variables`, each a person's number
+        of gene copies, where `table` maps each tuple of gene counts (in the
+        order of `variables`) to a non-negative weight.
+        """
+        self.variables = tuple(variables)
+        self.table = table
+
+    def __mul__(self, other):
+        shared = [var for var in other.variables if var in self.variables]
+        extra = [var for var in other.variables if var not in self.variables]
+        mine = [self.variables.index(var) for var in shared]
+        theirs = [other.variables.index(var) for var in shared]
+        rest = [other.variables.index(var) for var in extra]
+
+        # Join each row of this factor with the rows of the other that agree
+        # on the shared variables
+        rows = dict()
+        for values, p in other.table.items():
+            key = tuple(values[k] for k in theirs)
+            rows.setdefault(key, []).append(
+                (tuple(values[k] for k in rest), p)
+            )
+        table = dict()
+        for values, p in self.table.items():
+            for others, q in rows[tuple(values[k] for k in mine)]:
+                table[values + others] = p * q
+        return Factor(self.variables + tuple(extra), table)
+
+    def project(self, variables):
+        """
+        Return factor over `variables`, a subset of this factor's variables,
+        with every other variable summed out.
+        """
+        variables = tuple(variables)
+        keep = [self.variables.index(var) for var in variables]
+        table = dict.fromkeys(
+            itertools.product(GENES, repeat=len(variables)), 0
+        )
+        for values, p in self.table.items():
+            table[tuple(values[k] for k in keep)] += p
+        return Factor(variables, table)
+
+    def normalized(self):
+        """
+        Return factor scaled so that its weights sum to 1, or unchanged if
+        they sum to 0.
+        """
+        total = sum(self.table.values())
+        if total == 0:
+            return self
+        return Factor(self.variables, {
+            values: p / total for values, p in self.table.items()
+        })
+
+
+def unit(variables=()):
+    """Return factor over `variables` with every weight 1."""
+    variables = tuple(variables)
+    return Factor(variables, dict.fromkeys(
+        itertools.product(GENES, repeat=len(variables)), 1
+    ))
+
+
+def compile_factors(people, probs):
+    """
+    Return list of factors whose product is the joint probability of every
+    person's gene count and every known trait in `people`, as loaded by
+    `load_data`, under the probabilities `probs`.
+    Unknown traits sum to 1 whatever the gene count, so they get no factor.
+    """
+    tables = cpt.tables(probs)
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+
+        # Gene prior for people without parents in the data
+        if mother is None and father is None:
+            factors.append(Factor((person,), {
+                (g,): tables.prior[g] for g in GENES
+            }))
+
+        # Otherwise the inheritance CPT given both parents
+        else:
+            factors.append(Factor((person, mother, father), {
+                (g, m, f): tables.inheritance[g][m][f]
+                for g, m, f in itertools.product(GENES, repeat=3)
+            }))
+
+        # Trait CPT restricted to the observed trait
+        trait = people[person]["trait"]
+        if trait is not None:
+            factors.append(evidence(tables, person, trait))
+    return factors
+
+
+def evidence(tables, person, trait):
+    """
+    Return factor over `person` giving the probability of their observed
+    `trait` for each of their gene counts.
+    """
+    return Factor((person,), {(g,): tables.trait[g][trait] for g in GENES})
+
+
+def interaction_graph(factors):
+    """
+    Return dict mapping each variable in `factors` to the set of variables
+    it shares a factor with.
+    """
+    graph = dict()
+    for factor in factors:
+        for var in factor.variables:
+            graph.setdefault(var, set()).update(factor.variables)
+            graph[var].discard(var)
+    return graph
+
+
+def elimination_order(factors):
+    """
+    Return list of every variable in `factors`, in an order that eliminates
+    first whichever variable adds the fewest fill-in edges to the graph
+    linking variables that share a factor (breaking ties by fewest
+    neighbors).
+    """
+    graph = interaction_graph(factors)
+
+    def priority(var):
+        fill_in = sum(
+            1 for a, b in itertools.combinations(graph[var], 2)
+            if b not in graph[a]
+        )
+        return (fill_in, len(graph[var]), rank[var], var)
+
+    # Eliminating a variable only changes the fill-in of its neighbors and
+    # their neighbors, so keep a heap of priorities and re-push just those;
+    # an entry is stale once it no longer matches its variable's priority
+    rank = {var: k for k, var in enumerate(graph)}
+    queue = [priority(var) for var in graph]
+    heapq.heapify(queue)
+    order = []
+    while queue:
+        entry = heapq.heappop(queue)
+        var = entry[-1]
+        if var not in graph or entry != priority(var):
+            continue
+        neighbors = graph.pop(var)
+        for a, b in itertools.combinations(neighbors, 2):
+            graph[a].add(b)
+            graph[b].add(a)
+        affected = set(neighbors)
+        for neighbor in neighbors:
+            graph[neighbor].discard(var)
+            affected.update(graph[neighbor])
+        for other in affected:
+            heapq.heappush(queue, priority(other))
+        order.append(var)
+    return order
+
+
+class JunctionTree():
+
+    def __init__(self, factors, order=None):
+        """
+        Build a junction tree for the product of `factors`, from the cliques
+        formed by eliminating variables in `order` (min-fill by default).
+        """
+        if order is None:
+            order = elimination_order(factors)
+        position = {var: k for k, var in enumerate(order)}
+
+        # Eliminating each variable in turn forms a clique of it and its
+        # remaining neighbors, whose parent is the clique of the neighbor
+        # eliminated next. Children always come before their parents.
+        graph = interaction_graph(factors)
+        self.cliques = []
+        self.parents = []
+        self.clique_of = dict()
+        for k, var in enumerate(order):
+            neighbors = graph.pop(var)
+            for a, b in itertools.combinations(neighbors, 2):
+                graph[a].add(b)
+                graph[b].add(a)
+            for neighbor in neighbors:
+                graph[neighbor].discard(var)
+            self.cliques.append((var,) + tuple(
+                sorted(neighbors, key=position.get)
+            ))
+            self.parents.append(
+                min(neighbors, key=position.get) if neighbors else None
+            )
+            self.clique_of[var] = k
+        self.parents = [
+            self.clique_of[var] if var is not None else None
+            for var in self.parents
+        ]
+        self.children = [[] for clique in self.cliques]
+        for k, parent in enumerate(self.parents):
+            if parent is not None:
+                self.children[parent].append(k)
+
+        # Each factor goes to the clique of its first eliminated variable,
+        # which holds all of its other variables too
+        self.potentials = [unit(clique) for clique in self.cliques]
+        for factor in factors:
+            first = min(factor.variables, key=position.get)
+            k = self.clique_of[first]
+            self.potentials[k] = self.potentials[k] * factor
+
+        self.calibrate()
+
+    def separator(self, k):
+        """Return variables clique `k` shares with its parent."""
+        return self.cliques[k][1:]
+
+    def calibrate(self):
+        """
+        Forget every message, so that each is passed again, up from every
+        clique to its parent and back down, as beliefs come to need it.
+        Messages are normalized as they go, so long pedigrees do not
+        underflow.
+        """
+        self.up = [None] * len(self.cliques)
+        self.down = [None] * len(self.cliques)
+        self.beliefs = [None] * len(self.cliques)
+
+    def set_potential(self, k, factor):
+        """
+        Replace the potential of clique `k` with `factor`, over the same
+        variables, and forget just the messages that depend on it: those
+        passed up from it to the root of its tree, and those passed down to
+        every other clique in the tree.
+        """
+        self.potentials[k] = factor
+        path = set()
+        root = k
+        while root is not None:
+            path.add(root)
+            self.up[root] = None
+            k, root = root, self.parents[root]
+        frontier = [k]
+        while frontier:
+            j = frontier.pop()
+            if j not in path:
+                self.down[j] = None
+            self.beliefs[j] = None
+            frontier.extend(self.children[j])
+
+    def upward(self, k):
+        """
+        Return message from clique `k` to its parent, first passing any
+        forgotten messages it depends on from beneath it.
+        """
+        if self.up[k] is None:
+            stale = []
+            frontier = [k]
+            while frontier:
+                j = frontier.pop()
+                stale.append(j)
+                frontier.extend(
+                    child for child in self.children[j]
+                    if self.up[child] is None
+                )
+
+            # Children always come before their parents
+            for j in sorted(stale):
+                belief = self.gather(j, exclude=None, down=False)
+                self.up[j] = belief.project(self.separator(j)).normalized()
+        return self.up[k]
+
+    def downward(self, k):
+        """
+        Return message to clique `k` from its parent (None for a root), first
+        passing any forgotten messages it depends on.
+        """
+        path = []
+        j = k
+        while self.parents[j] is not None and self.down[j] is None:
+            path.append(j)
+            j = self.parents[j]
+        for j in reversed(path):
+            belief = self.gather(self.parents[j], exclude=j, down=True)
+            self.down[j] = belief.project(self.separator(j)).normalized()
+        return self.down[k]
+
+    def gather(self, k, exclude, down):
+        """
+        Return potential of clique `k` times the messages from its children,
+        except `exclude`, and, if `down`, the message from its parent.
+        """
+        belief = self.potentials[k]
+        for child in self.children[k]:
+            if child != exclude:
+                belief = belief * self.upward(child)
+        if down and self.parents[k] is not None:
+            belief = belief * self.downward(k)
+        return belief
+
+    def marginal(self, var):
+        """Return dict mapping each gene count to its probability for `var`."""
+        k = self.clique_of[var]
+        if self.beliefs[k] is None:
+            self.beliefs[k] = self.gather(k, exclude=None, down=True)
+        belief = self.beliefs[k]
+        factor = belief.project((var,)).normalized()
+        return {g: factor.table[(g,)] for g in GENES}
+
+
+class Pedigree():
+
+    def __init__(self, people, probs):
+        """
+        Compile the pedigree in `people`, as loaded by `load_data`, into a
+        junction tree under probabilities `probs`, with the known traits in
+        `people` as evidence. The pedigree keeps its own record of which
+        traits are observed, so `people` is not changed.
+        """
+        self.tables = cpt.tables(probs)
+        self.names = list(people)
+        self.traits = {
+            person: people[person]["trait"] for person in people
+            if people[person]["trait"] is not None
+        }
+        structure = {
+            person: dict(people[person], trait=None) for person in people
+        }
+        self.tree = JunctionTree(compile_factors(structure, probs))
+        self.structure = list(self.tree.potentials)
+
+        # People whose traits are evidence in each clique, whose potentials
+        # can be set directly as no messages have been passed yet
+        self.observed = [set() for clique in self.tree.cliques]
+        for person in self.traits:
+            self.observed[self.tree.clique_of[person]].add(person)
+        for k, observed in enumerate(self.observed):
+            if observed:
+                self.tree.potentials[k] = self.potential(k)
+
+    def potential(self, k):
+        """Return potential of clique `k` with its factors and evidence."""
+        potential = self.structure[k]
+        for person in self.observed[k]:
+            potential = potential * evidence(
+                self.tables, person, self.traits[person]
+            )
+        return potential
+
+    def observe(self, person, trait):
+        """Record whether `person` has the trait (True) or not (False)."""
+        self.traits[person] = trait
+        k = self.tree.clique_of[person]
+        self.observed[k].add(person)
+        self.tree.set_potential(k, self.potential(k))
+
+    def retract(self, person):
+        """Forget any observation of whether `person` has the trait."""
+        if person not in self.traits:
+            return
+        del self.traits[person]
+        k = self.tree.clique_of[person]
+        self.observed[k].discard(person)
+        self.tree.set_potential(k, self.potential(k))
+
+    def marginal(self, person):
+        """
+        Return dict with the "gene" and "trait" distributions of `person`
+        given every observation so far.
+        """
+        gene = self.tree.marginal(person)
+        trait = self.traits.get(person)
+        if trait is not None:
+            traits = {True: float(trait), False: float(not trait)}
+        else:
+            traits = {
+                t: sum(gene[g] * self.tables.trait[g][t] for g in GENES)
+                for t in (True, False)
+            }
+        return {"gene": {g: gene[g] for g in (2, 1, 0)}, "trait": traits}
+
+    def marginals(self):
+        """Return dict mapping each person to their `marginal`."""
+        return {person: self.marginal(person) for person in self.names}
+
+
+def marginals(people, probs):
+    """
+    Return dict mapping each person to their "gene" and "trait" distributions
+    given the known traits in `people`, in the format printed by heredity.py.
+    """
+    return Pedigree(people, probs).marginals()
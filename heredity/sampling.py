@@ -0,0 +1,399 @@
+import math
+import multiprocessing
+import random
+
+import cpt
+from cpt import GENES
+
+GIBBS = "gibbs"
+LIKELIHOOD_WEIGHTING = "lw"
+
+
+class Sampler():
+
+    def __init__(self, people, probs, method=GIBBS, burn_in=100):
+        """
+        Prepare to sample gene counts for the pedigree in `people`, as loaded
+        by `load_data`, given its known traits, under probabilities `probs`.
+        `method` is GIBBS, resampling each person from their Markov blanket
+        in turn, or LIKELIHOOD_WEIGHTING, sampling everyone from their
+        parents and weighting each sample by the known traits. Gibbs chains
+        discard their first `burn_in` sweeps.
+        """
+        self.method = method
+        self.burn_in = burn_in
+        self.tables = cpt.tables(probs)
+        self.names = list(people)
+        row = {person: k for k, person in enumerate(self.names)}
+
+        # Rows of each person's parents (None for founders), and of each
+        # person's children along with which parent the person is to them
+        self.parents = []
+        self.children = [[] for person in self.names]
+        for k, person in enumerate(self.names):
+            mother = people[person]["mother"]
+            father = people[person]["father"]
+            if mother is None and father is None:
+                self.parents.append(None)
+                continue
+            self.parents.append((row[mother], row[father]))
+            self.children[row[mother]].append((k, 0))
+            self.children[row[father]].append((k, 1))
+
+        # Probability of each known trait given each gene count, and the
+        # chance of having the trait given each gene count (1 or 0 if known)
+        self.evidence = []
+        self.trait_given = []
+        for person in self.names:
+            trait = people[person]["trait"]
+            if trait is None:
+                self.evidence.append((1, 1, 1))
+                self.trait_given.append(
+                    tuple(self.tables.trait[g][True] for g in GENES)
+                )
+            else:
+                self.evidence.append(
+                    tuple(self.tables.trait[g][trait] for g in GENES)
+                )
+                self.trait_given.append((float(trait),) * len(GENES))
+
+        # Rows of the inheritance table over a person's own gene count: as a
+        # child given their parents' counts, as a mother given a child's and
+        # father's counts, and as a father given a child's and mother's
+        inheritance = self.tables.inheritance
+        self.rows = (
+            [
+                [tuple(inheritance[g][m][f] for g in GENES) for f in GENES]
+                for m in GENES
+            ],
+            [
+                [tuple(inheritance[c][g][f] for g in GENES) for f in GENES]
+                for c in GENES
+            ],
+            [
+                [tuple(inheritance[c][m][g] for g in GENES) for m in GENES]
+                for c in GENES
+            ]
+        )
+
+        # Order in which everyone comes after their parents
+        self.order = []
+        placed = set()
+        for k in range(len(self.names)):
+            stack = [k]
+            while stack:
+                j = stack[-1]
+                if j in placed:
+                    stack.pop()
+                    continue
+                waiting = [
+                    parent for parent in (self.parents[j] or ())
+                    if parent not in placed
+                ]
+                if waiting:
+                    stack.extend(waiting)
+                else:
+                    placed.add(j)
+                    self.order.append(j)
+                    stack.pop()
+
+    def base(self, genes, k, g):
+        """
+        Return probability that person `k` has `g` copies, given their
+        parents' copies in `genes`.
+        """
+        if self.parents[k] is None:
+            return self.tables.prior[g]
+        mother, father = self.parents[k]
+        return self.tables.inheritance[g][genes[mother]][genes[father]]
+
+    def draw(self, rng, weights):
+        """Return a gene count drawn in proportion to `weights`."""
+        r = rng.random() * sum(weights)
+        for g in GENES:
+            r -= weights[g]
+            if r < 0:
+                return g
+        return GENES[-1]
+
+    def forward(self, rng):
+        """
+        Return (genes, log_weight): gene counts sampled for everyone from
+        their parents, and the log probability of the known traits given
+        those counts.
+        """
+        genes = [0] * len(self.names)
+        log_weight = 0
+        for k in self.order:
+            genes[k] = self.draw(rng, [self.base(genes, k, g) for g in GENES])
+            evidence = self.evidence[k][genes[k]]
+            log_weight += math.log(evidence) if evidence else -math.inf
+        return genes, log_weight
+
+    def sweep(self, rng, genes):
+        """
+        Resample every person's gene count in `genes` in place, each given
+        their parents, children, children's other parents and known trait.
+        """
+        # Work on all three gene counts at once, as rows of the inheritance
+        # table read along the person's own gene count
+        prior = self.tables.prior
+        given_parents, as_mother, as_father = self.rows
+        for k in self.order:
+            evidence = self.evidence[k]
+            if self.parents[k] is None:
+                base = prior
+            else:
+                mother, father = self.parents[k]
+                base = given_parents[genes[mother]][genes[father]]
+            w0 = base[0] * evidence[0]
+            w1 = base[1] * evidence[1]
+            w2 = base[2] * evidence[2]
+            for child, role in self.children[k]:
+                mother, father = self.parents[child]
+                if role == 0:
+                    row = as_mother[genes[child]][genes[father]]
+                else:
+                    row = as_father[genes[child]][genes[mother]]
+                w0 *= row[0]
+                w1 *= row[1]
+                w2 *= row[2]
+            r = rng.random() * (w0 + w1 + w2)
+            genes[k] = 0 if r < w0 else 1 if r < w0 + w1 else 2
+
+    def run(self, state, samples):
+        """
+        Continue a chain for `samples` more samples from `state`, which is
+        (seed, genes, random state), with genes and random state None for a
+        new chain. Return (state, tally) with the chain's new state and a
+        Tally of just those samples.
+        """
+        seed, genes, rng_state = state
+        rng = random.Random(seed)
+        if rng_state is not None:
+            rng.setstate(rng_state)
+
+        tally = Tally(len(self.names))
+        if self.method == GIBBS:
+            if genes is None:
+                genes = self.start(rng)
+                for k in range(self.burn_in):
+                    self.sweep(rng, genes)
+            for k in range(samples):
+                self.sweep(rng, genes)
+                tally.add(genes, 0, self.trait_given)
+        else:
+            for k in range(samples):
+                sample, log_weight = self.forward(rng)
+                tally.add(sample, log_weight, self.trait_given)
+        return (seed, genes, rng.getstate()), tally
+
+    def start(self, rng):
+        """
+        Return gene counts to start a Gibbs chain from: a forward sample
+        that agrees with the known traits, or failing that any forward
+        sample.
+        """
+        for attempt in range(100):
+            genes, log_weight = self.forward(rng)
+            if log_weight > -math.inf:
+                return genes
+        return genes
+
+
+class Tally():
+
+    def __init__(self, size):
+        """
+        Create empty weighted totals of samples of the gene counts of `size`
+        people. Weights are stored relative to exp(`shift`), the largest
+        weight added so far, so that they never underflow.
+        """
+        self.shift = -math.inf
+        self.samples = 0
+        self.weight = 0
+        self.weight_squared = 0
+        self.genes = [[0] * len(GENES) for k in range(size)]
+        self.traits = [0] * size
+        self.traits_squared = [0] * size
+
+    def rescale(self, shift):
+        """Express totals relative to exp(`shift`), at least the current."""
+        if shift == self.shift:
+            return
+        scale = math.exp(self.shift - shift)
+        self.weight *= scale
+        self.weight_squared *= scale * scale
+        for counts in self.genes:
+            for g in GENES:
+                counts[g] *= scale
+        self.traits = [total * scale for total in self.traits]
+        self.traits_squared = [
+            total * scale for total in self.traits_squared
+        ]
+        self.shift = shift
+
+    def add(self, genes, log_weight, trait_given):
+        """
+        Add a sample of everyone's gene counts with weight exp(`log_weight`),
+        counting each person's trait as its probability given their genes,
+        from `trait_given`.
+        """
+        self.samples += 1
+        if log_weight == -math.inf:
+            return
+        if log_weight > self.shift:
+            self.rescale(log_weight)
+        w = math.exp(log_weight - self.shift)
+        self.weight += w
+        self.weight_squared += w * w
+        for k, g in enumerate(genes):
+            self.genes[k][g] += w
+            t = trait_given[k][g]
+            self.traits[k] += w * t
+            self.traits_squared[k] += w * t * t
+
+    def merge(self, other):
+        """Add the totals of another Tally over the same people."""
+        shift = max(self.shift, other.shift)
+        if shift == -math.inf:
+            self.samples += other.samples
+            return
+        self.rescale(shift)
+        other.rescale(shift)
+        self.samples += other.samples
+        self.weight += other.weight
+        self.weight_squared += other.weight_squared
+        for mine, theirs in zip(self.genes, other.genes):
+            for g in GENES:
+                mine[g] += theirs[g]
+        for k in range(len(self.traits)):
+            self.traits[k] += other.traits[k]
+            self.traits_squared[k] += other.traits_squared[k]
+
+    def effective_samples(self):
+        """Return Kish's effective sample size of the weighted samples."""
+        if self.weight_squared == 0:
+            return 0
+        return self.weight ** 2 / self.weight_squared
+
+    def moments(self):
+        """
+        Return list of (mean, variance) of each person's gene count and of
+        each person's chance of the trait, under the weighted samples.
+        """
+        moments = []
+        for counts, total, squares in zip(
+            self.genes, self.traits, self.traits_squared
+        ):
+            mean = sum(g * counts[g] for g in GENES) / self.weight
+            square = sum(g * g * counts[g] for g in GENES) / self.weight
+            moments.append((mean, max(square - mean * mean, 0)))
+            mean = total / self.weight
+            moments.append((mean, max(squares / self.weight - mean ** 2, 0)))
+        return moments
+
+
+def diagnostics(tallies):
+    """
+    Given one Tally per chain, return (R-hat, ESS): the largest potential
+    scale reduction factor and the smallest effective sample size (as in
+    Gelman et al., Bayesian Data Analysis, 2nd ed.) over every person's gene
+    count and chance of the trait. R-hat is None with a single chain.
+    """
+    if any(tally.weight == 0 for tally in tallies):
+        return math.inf, 0
+    m = len(tallies)
+    n = sum(tally.effective_samples() for tally in tallies) / m
+    if m < 2:
+        return None, n
+    worst_rhat = 1
+    worst_ess = m * n
+    chains = [tally.moments() for tally in tallies]
+    for estimates in zip(*chains):
+        means = [mean for mean, variance in estimates]
+        within = sum(variance for mean, variance in estimates) / m
+        average = sum(means) / m
+        between = sum((mean - average) ** 2 for mean in means) / (m - 1)
+        if within == 0:
+            if between > 0:
+                return math.inf, 0
+            continue
+        pooled = (n - 1) / n * within + between
+        worst_rhat = max(worst_rhat, math.sqrt(pooled / within))
+        if between > 0:
+            worst_ess = min(worst_ess, m * pooled / between)
+    return worst_rhat, worst_ess
+
+
+# Sampler of the pedigree being run by this worker process
+worker_sampler = None
+
+
+def start_worker(sampler):
+    """Keep `sampler` for the chains run by this worker process."""
+    global worker_sampler
+    worker_sampler = sampler
+
+
+def run_chain(job):
+    """Run a chain for more samples, given (state, samples)."""
+    state, samples = job
+    return worker_sampler.run(state, samples)
+
+
+def marginals(people, probs, method=GIBBS, chains=4, samples=100000,
+              rhat=1.01, ess=2000, block=200, seed=None, workers=None,
+              report=None):
+    """
+    Return dict mapping each person to their "gene" and "trait" distributions
+    given the known traits in `people`, estimated by `chains` chains run in
+    parallel in a pool of `workers` processes (one per chain by default).
+
+    Chains run in blocks of `block` samples each, and stop once R-hat is at
+    most `rhat` and the effective sample size at least `ess`, or after
+    `samples` samples per chain. After each block, `report` (if given) is
+    called with the samples per chain so far, the running marginals, R-hat
+    and ESS.
+    """
+    sampler = Sampler(people, probs, method)
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    states = [(seed + k, None, None) for k in range(chains)]
+    tallies = [Tally(len(sampler.names)) for k in range(chains)]
+
+    with multiprocessing.Pool(
+        workers or chains, initializer=start_worker, initargs=(sampler,)
+    ) as pool:
+        taken = 0
+        while taken < samples:
+            size = min(block, samples - taken)
+            results = pool.map(run_chain, [(state, size) for state in states])
+            taken += size
+            states = [state for state, tally in results]
+            for tally, (state, new) in zip(tallies, results):
+                tally.merge(new)
+
+            r, n = diagnostics(tallies)
+            if report is not None:
+                report(taken, estimates(sampler, tallies), r, n)
+            if (r is None or r <= rhat) and n >= ess:
+                break
+
+    return estimates(sampler, tallies)
+
+
+def estimates(sampler, tallies):
+    """Return marginals, in the format of `marginals`, pooled over chains."""
+    total = Tally(len(sampler.names))
+    for tally in tallies:
+        total.merge(tally)
+    probabilities = dict()
+    for k, person in enumerate(sampler.names):
+        weight = total.weight or 1
+        chance = total.traits[k] / weight
+        probabilities[person] = {
+            "gene": {g: total.genes[k][g] / weight for g in (2, 1, 0)},
+            "trait": {True: chance, False: 1 - chance}
+        }
+    return probabilities
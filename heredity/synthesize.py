@@ -0,0 +1,148 @@
+import argparse
+import csv
+import random
+
+import cpt
+from heredity import PROBS
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python synthesize.py output.csv [options]",
+        description="Write a random pedigree in the format of the data files."
+    )
+    parser.add_argument("output")
+    parser.add_argument(
+        "--size", type=int, default=40,
+        help="number of people (default: 40)"
+    )
+    parser.add_argument(
+        "--depth", type=int, default=4,
+        help="number of generations (default: 4)"
+    )
+    parser.add_argument(
+        "--founders", type=float, default=0.4,
+        help="fraction of people without parents in the data, counting "
+             "the first generation and everyone marrying in (default: 0.4)"
+    )
+    parser.add_argument(
+        "--observed", type=float, default=0.5,
+        help="fraction of people whose trait is known (default: 0.5)"
+    )
+    parser.add_argument(
+        "--consanguinity", type=float, default=0.0,
+        help="chance that a couple are both from the family rather than "
+             "one marrying in (default: 0)"
+    )
+    parser.add_argument(
+        "--seed", type=int,
+        help="seed for the random pedigree (default: random)"
+    )
+    args = parser.parse_args()
+
+    people = synthesize(
+        args.size, depth=args.depth, founders=args.founders,
+        observed=args.observed, consanguinity=args.consanguinity,
+        rng=random.Random(args.seed)
+    )
+    write_data(people, args.output)
+
+
+def synthesize(size, depth=4, founders=0.4, observed=0.5, consanguinity=0.0,
+               rng=random, probs=PROBS):
+    """
+    Return a random pedigree of `size` people over `depth` generations, in
+    the format of `load_data`.
+
+    About a `founders` fraction of people have no parents in the data: the
+    first generation, and spouses marrying into later ones. Each couple is
+    two members of the family with chance `consanguinity`, and otherwise
+    one member and someone marrying in. Everyone's genes and trait are
+    simulated under `probs`, and each trait is known with chance `observed`.
+    """
+    tables = cpt.tables(probs)
+    people = dict()
+    genes = dict()
+
+    def add(mother=None, father=None):
+        name = f"P{len(people) + 1}"
+        if mother is None:
+            weights = tables.prior
+        else:
+            weights = [
+                tables.inheritance[g][genes[mother]][genes[father]]
+                for g in cpt.GENES
+            ]
+        genes[name] = rng.choices(cpt.GENES, weights)[0]
+        trait = rng.random() < tables.trait[genes[name]][True]
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": trait if rng.random() < observed else None
+        }
+        return name
+
+    # Split founders between the first generation and those marrying in,
+    # and share out everyone else evenly across the later generations
+    total = max(2, min(size, round(size * founders)))
+    first = total if depth < 2 else max(2, round(total / depth))
+    spouses = total - first
+    generation = [add() for k in range(first)]
+
+    for g in range(1, depth):
+        remaining = size - len(people)
+        if remaining <= 0 or len(generation) < 2 and spouses <= 0:
+            break
+        children = (remaining - spouses) // (depth - g)
+
+        # Pair up members of the last generation, marrying in founders
+        # while any are left and the couple is not to be consanguineous
+        rng.shuffle(generation)
+        couples = []
+        while generation:
+            member = generation.pop()
+            if spouses > 0 and (
+                not generation or rng.random() >= consanguinity
+            ):
+                couples.append((member, add()))
+                spouses -= 1
+            elif generation:
+                couples.append((member, generation.pop()))
+        if not couples:
+            break
+
+        # Give each couple children, in turn from a random couple
+        generation = []
+        start = rng.randrange(len(couples))
+        for k in range(children):
+            if len(people) >= size:
+                break
+            mother, father = couples[(start + k) % len(couples)]
+            generation.append(add(mother, father))
+
+    # Anyone left over joins as a founder
+    while len(people) < size:
+        add()
+    return people
+
+
+def write_data(people, filename):
+    """Write pedigree `people` to a CSV file that `load_data` can read."""
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = person["trait"]
+            writer.writerow([
+                person["name"],
+                person["mother"] or "",
+                person["father"] or "",
+                "" if trait is None else int(trait)
+            ])
+
+
+if __name__ == "__main__":
+    main()
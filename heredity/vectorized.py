@@ -0,0 +1,139 @@
+import numpy as np
+
+import cpt
+from cpt import GENES
+
+
+class Encoding():
+
+    def __init__(self, people, probs):
+        """
+        Encode the pedigree in `people`, as loaded by `load_data`, so that
+        joint probabilities can be computed for whole batches of assignments.
+        Row k of each batch is the kth person in `people`.
+        """
+        self.names = list(people)
+        row = {person: k for k, person in enumerate(self.names)}
+
+        # Log probability tables, indexed by gene counts and traits (0 or 1),
+        # where impossible events (such as without mutation) are -inf
+        tables = cpt.tables(probs)
+        with np.errstate(divide="ignore"):
+            self.log_prior = np.log(tables.prior)
+            self.log_inheritance = np.log(tables.inheritance)
+            self.log_trait = np.log(tables.trait)
+
+        # Rows of people without parents, and of everyone else along with
+        # the rows of their mother and father
+        self.founders = np.array([
+            row[person] for person in self.names
+            if people[person]["mother"] is None
+            and people[person]["father"] is None
+        ], dtype=np.intp)
+        children = [
+            person for person in self.names
+            if people[person]["mother"] is not None
+            or people[person]["father"] is not None
+        ]
+        self.children = np.array(
+            [row[person] for person in children], dtype=np.intp
+        )
+        self.mothers = np.array(
+            [row[people[person]["mother"]] for person in children],
+            dtype=np.intp
+        )
+        self.fathers = np.array(
+            [row[people[person]["father"]] for person in children],
+            dtype=np.intp
+        )
+
+        # Known traits, and the rows of people whose trait is unknown
+        self.known = np.array([
+            int(bool(people[person]["trait"])) for person in self.names
+        ], dtype=np.intp)
+        self.unknown = np.array([
+            row[person] for person in self.names
+            if people[person]["trait"] is None
+        ], dtype=np.intp)
+
+    def log_joint(self, genes, traits):
+        """
+        Given arrays of gene counts and traits (0 or 1) of shape
+        (people, batch), return array of the log joint probability of each
+        column's assignment.
+        """
+        log_p = self.log_prior[genes[self.founders]].sum(axis=0)
+        log_p += self.log_inheritance[
+            genes[self.children], genes[self.mothers], genes[self.fathers]
+        ].sum(axis=0)
+        log_p += self.log_trait[genes, traits].sum(axis=0)
+        return log_p
+
+    def assignments(self, start, stop):
+        """
+        Return (genes, traits) arrays for assignments `start` to `stop` of
+        every assignment agreeing with the known traits, counting each
+        person's gene count and each unknown trait as a digit of the index.
+        """
+        index = np.arange(start, stop, dtype=np.int64)
+        genes = np.empty((len(self.names), len(index)), dtype=np.intp)
+        for k in range(len(self.names)):
+            index, genes[k] = np.divmod(index, 3)
+        traits = np.repeat(self.known[:, None], len(genes[0]), axis=1)
+        for k in self.unknown:
+            index, traits[k] = np.divmod(index, 2)
+        return genes, traits
+
+    def size(self):
+        """Return number of assignments agreeing with the known traits."""
+        return 3 ** len(self.names) * 2 ** len(self.unknown)
+
+
+def marginals(people, probs, batch=1 << 16):
+    """
+    Return dict mapping each person to their "gene" and "trait" distributions
+    by summing the joint probability of every assignment agreeing with the
+    known traits, evaluated `batch` assignments at a time.
+    """
+    encoding = Encoding(people, probs)
+    rows = np.arange(len(encoding.names))[:, None]
+    gene_totals = np.zeros((len(encoding.names), len(GENES)))
+    trait_totals = np.zeros((len(encoding.names), 2))
+
+    # Weights are kept relative to the largest log probability seen so far,
+    # rescaling the totals whenever it grows, so that they never underflow
+    shift = -np.inf
+    for start in range(0, encoding.size(), batch):
+        stop = min(start + batch, encoding.size())
+        genes, traits = encoding.assignments(start, stop)
+        log_p = encoding.log_joint(genes, traits)
+        top = log_p.max()
+        if top > shift:
+            gene_totals *= np.exp(shift - top)
+            trait_totals *= np.exp(shift - top)
+            shift = top
+        weights = np.broadcast_to(np.exp(log_p - shift), genes.shape)
+
+        # Scatter into flattened totals, which np.add.at handles faster
+        # than a pair of index arrays
+        np.add.at(
+            gene_totals.reshape(-1),
+            (rows * len(GENES) + genes).ravel(), weights.ravel()
+        )
+        np.add.at(
+            trait_totals.reshape(-1), (rows * 2 + traits).ravel(),
+            weights.ravel()
+        )
+
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+    return {
+        person: {
+            "gene": {g: float(gene_totals[k, g]) for g in (2, 1, 0)},
+            "trait": {
+                True: float(trait_totals[k, 1]),
+                False: float(trait_totals[k, 0])
+            }
+        }
+        for k, person in enumerate(encoding.names)
+    }
@@ -0,0 +1,134 @@
+import argparse
+import random
+import time
+
+import puzzle
+from logic import (ENGINES, And, Implication, Not, Or, Symbol, model_check,
+                   model_check_many)
+
+# Most characters in a generated puzzle each engine is run on, since
+# enumerating models costs twice as much for each symbol more
+LIMITS = {"enumerate": 6, "parallel": 6, "vectorized": 11}
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [options]",
+        description="Time checking which symbols each puzzle entails, one "
+                    "query at a time and all at once."
+    )
+    parser.add_argument(
+        "--characters", type=int, nargs="+", default=[4, 6, 8, 11, 50, 200],
+        help="numbers of characters in generated puzzles "
+             "(default: 4 6 8 11 50 200)"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=ENGINES, default=ENGINES,
+        help="entailment engines to time (default: all)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="times to run each check, keeping the fastest (default: 3)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed for generated puzzles (default: 0)"
+    )
+    args = parser.parse_args()
+
+    symbols = [
+        puzzle.AKnight, puzzle.AKnave, puzzle.BKnight, puzzle.BKnave,
+        puzzle.CKnight, puzzle.CKnave
+    ]
+    puzzles = [
+        ("Puzzle 0", puzzle.knowledge0, symbols),
+        ("Puzzle 1", puzzle.knowledge1, symbols),
+        ("Puzzle 2", puzzle.knowledge2, symbols),
+        ("Puzzle 3", puzzle.knowledge3, symbols)
+    ]
+    rng = random.Random(args.seed)
+    for characters in args.characters:
+        knowledge, symbols = generate_puzzle(characters, rng)
+        puzzles.append((f"{characters} characters", knowledge, symbols))
+
+    print(
+        f"{'puzzle':<15} {'engine':<11} {'one by one':>11} {'all at once':>11}"
+        f" {'speedup':>8}"
+    )
+    for name, knowledge, symbols in puzzles:
+        for engine in args.engines:
+            characters = len(symbols) // 2
+            if characters > LIMITS.get(engine, characters):
+                continue
+            one, separately = best_time(args.repeat, lambda: {
+                symbol for symbol in symbols
+                if model_check(knowledge, symbol, engine=engine)
+            })
+            many, together = best_time(
+                args.repeat,
+                lambda: model_check_many(knowledge, symbols, engine=engine)
+            )
+            if separately != together:
+                raise Exception(f"{engine} disagrees with itself on {name}")
+            print(
+                f"{name:<15} {engine:<11} {one * 1000:>9.2f}ms "
+                f"{many * 1000:>9.2f}ms {one / many:>7.1f}x"
+            )
+
+
+def best_time(repeat, check):
+    """Return fastest of `repeat` runs of `check`, and what it returned."""
+    times = []
+    for k in range(repeat):
+        start = time.perf_counter()
+        result = check()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def generate_puzzle(characters, rng=random):
+    """
+    Return (knowledge, symbols) for a random puzzle in which each of
+    `characters` characters, each secretly a knight or a knave, makes one
+    statement about some of the others, in the style of puzzle.py, where
+    `symbols` says of each character that they are a knight and a knave.
+    """
+    knights = [Symbol(f"{k} is a Knight") for k in range(characters)]
+    knaves = [Symbol(f"{k} is a Knave") for k in range(characters)]
+    model = dict()
+    for knight, knave in zip(knights, knaves):
+        model[knight.name] = rng.random() < 0.5
+        model[knave.name] = not model[knight.name]
+
+    def statement():
+        x, y = rng.randrange(characters), rng.randrange(characters)
+        return rng.choice([
+            lambda: knights[x],
+            lambda: knaves[x],
+            lambda: Or(And(knights[x], knights[y]), And(knaves[x], knaves[y])),
+            lambda: Or(knaves[x], knaves[y]),
+            lambda: And(knights[x], knaves[y])
+        ])()
+
+    # Knights only say what is true and knaves only what is false, so draw
+    # statements until one fits its speaker, so the puzzle has a solution
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+        said = statement()
+        while said.evaluate(model) != model[knight.name]:
+            said = statement()
+        knowledge.add(Implication(knight, said))
+        knowledge.add(Implication(knave, Not(said)))
+
+    symbols = [
+        symbol for pair in zip(knights, knaves) for symbol in pair
+    ]
+    return knowledge, symbols
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,76 @@
+import functools
 import itertools
+import weakref
+
+
+def cached(method):
+    """
+    Cache what a sentence's `method` returns in the slot named after it
+    (such as `_hash` for `__hash__`), until a conjunction it contains is
+    added to.
+    """
+    slot = "_" + method.__name__.strip("_")
+
+    @functools.wraps(method)
+    def wrapper(self):
+        if self.mutable and self.stamp != Sentence.generation:
+            self.clear()
+        value = getattr(self, slot)
+        if value is None:
+            value = method(self)
+            setattr(self, slot, value)
+        return value
+    return wrapper
 
 
 class Sentence():
 
+    __slots__ = ("mutable", "stamp", "_hash", "_symbols", "_formula",
+                 "__weakref__")
+
+    # Conjunctions can be added to, so sentences containing one keep cached
+    # values only until the next addition to any conjunction
+    generation = 0
+
+    @classmethod
+    def intern(cls, key, operands, **fields):
+        """
+        Return the sentence of this class with the given tuple of operands
+        and fields, looked up by `key` in the class's table of interned
+        sentences, creating it if there is none.
+        """
+
+        # A sentence containing a conjunction can change, so as an operand it
+        # is looked up by identity rather than by value, so that sentences
+        # built from conjunctions equal only for now stay apart. The id lasts
+        # as long as the entry, since the interned sentence keeps it alive
+        mutable = any(
+            isinstance(operand, Sentence) and operand.mutable
+            for operand in operands
+        )
+        if mutable:
+            key = tuple(
+                id(operand)
+                if isinstance(operand, Sentence) and operand.mutable
+                else operand
+                for operand in operands
+            )
+
+        sentence = cls.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for field, value in fields.items():
+                setattr(sentence, field, value)
+            sentence.mutable = mutable
+            sentence.clear()
+            cls.interned[key] = sentence
+        return sentence
+
+    def clear(self):
+        """Forget cached values."""
+        self.stamp = Sentence.generation
+        self._hash = self._symbols = self._formula = None
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -12,8 +80,8 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        return frozenset()
 
     @classmethod
     def validate(cls, sentence):
@@ -46,12 +114,25 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    # Every symbol by name, and every other sentence but a conjunction by
+    # its operands, so that building one structurally identical to another
+    # that exists returns that one
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, name):
+        return cls.intern(name, (), name=name)
+
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
+    @cached
     def __hash__(self):
         return hash(("symbol", self.name))
 
@@ -67,18 +148,30 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
+    @cached
     def symbols(self):
-        return {self.name}
+        return frozenset([self.name])
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(operand, (operand,), operand=operand)
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and hash(self) == hash(other)
+            and self.operand == other.operand
+        )
 
+    @cached
     def __hash__(self):
         return hash(("not", hash(self.operand)))
 
@@ -88,6 +181,7 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    @cached
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
@@ -96,14 +190,27 @@ class Not(Sentence):
 
 
 class And(Sentence):
+
+    # Conjunctions can be added to, so each is a sentence of its own
+    # rather than interned
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.mutable = True
+        self.clear()
+
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
+    @cached
     def __hash__(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
@@ -117,30 +224,55 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+
+        # Keep this conjunction's symbols up to date, rather than finding
+        # them all again, but let everything else containing one recompute
+        symbols = self._symbols
+        if self.stamp != Sentence.generation:
+            symbols = None
         self.conjuncts.append(conjunct)
+        Sentence.generation += 1
+        self.clear()
+        if symbols is not None:
+            self._symbols = symbols | conjunct.symbols()
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    @cached
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.intern(disjuncts, disjuncts, disjuncts=disjuncts)
+
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and hash(self) == hash(other)
+            and self.disjuncts == other.disjuncts
+        )
 
+    @cached
     def __hash__(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
@@ -153,28 +285,44 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    @cached
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        operands = (antecedent, consequent)
+        return cls.intern(
+            operands, operands, antecedent=antecedent, consequent=consequent
+        )
+
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication) and hash(self) == hash(other)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
+    @cached
     def __hash__(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
@@ -185,27 +333,39 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    @cached
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    @cached
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self.antecedent.symbols() | self.consequent.symbols()
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        operands = (left, right)
+        return cls.intern(operands, operands, left=left, right=right)
+
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional) and hash(self) == hash(other)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
+    @cached
     def __hash__(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
@@ -218,17 +378,39 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    @cached
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
+    @cached
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        return self.left.symbols() | self.right.symbols()
+
+
+ENGINES = ["enumerate", "parallel", "vectorized", "sat"]
+
+
+def model_check(knowledge, query, engine="enumerate"):
+    """
+    Checks if knowledge base entails query, by `engine`: "enumerate" checks
+    every model, "parallel" checks every model in a process per CPU,
+    "vectorized" checks every model 64 at a time with NumPy, and "sat"
+    checks that knowledge and the negation of query cannot both be
+    satisfied.
+    """
+    if engine == "parallel":
+        import parallel
+        return parallel.entails(knowledge, query)
+    if engine == "vectorized":
+        import vectorized
+        return vectorized.entails(knowledge, query)
+    if engine == "sat":
+        import sat
+        return sat.entails(knowledge, query)
+    if engine != "enumerate":
+        raise ValueError(f"unknown engine {engine}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -259,7 +441,67 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def model_check_many(knowledge, queries, engine="enumerate"):
+    """
+    Checks which queries knowledge base entails, by `engine` as for
+    `model_check`, and returns a set of them. Models are only enumerated
+    once, dropping each query as soon as a model shows it is not entailed.
+    """
+    queries = list(queries)
+    if engine == "parallel":
+        import parallel
+        return parallel.entailed(knowledge, queries)
+    if engine == "vectorized":
+        import vectorized
+        return vectorized.entailed(knowledge, queries)
+    if engine == "sat":
+        import sat
+        return sat.entailed(knowledge, queries)
+    if engine != "enumerate":
+        raise ValueError(f"unknown engine {engine}")
+
+    # Queries not yet false in any model of the knowledge base, with the
+    # symbols of each that the knowledge base does not mention, which a
+    # query must hold for every assignment of to be entailed
+    symbols = knowledge.symbols()
+    live = {query: sorted(query.symbols() - symbols) for query in queries}
+
+    def check_all(symbols, model):
+        """Drops queries not entailed, given a particular model."""
+
+        # Stop once every query is known not to be entailed
+        if not live:
+            return
+
+        # If model has an assignment for each symbol
+        if not symbols:
+
+            # If knowledge base is true in model, drop queries false in it
+            if knowledge.evaluate(model):
+                for query, extra in list(live.items()):
+                    for values in itertools.product([True, False],
+                                                    repeat=len(extra)):
+                        model.update(zip(extra, values))
+                        if not query.evaluate(model):
+                            del live[query]
+                            break
+        else:
+
+            # Choose one of the remaining unused symbols
+            remaining = symbols.copy()
+            p = remaining.pop()
+
+            # Check models where the symbol is true, then false
+            for value in (True, False):
+                model_value = model.copy()
+                model_value[p] = value
+                check_all(remaining, model_value)
+
+    check_all(set(symbols), dict())
+    return set(live)
@@ -0,0 +1,202 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+SYMBOL, NOT, AND, OR, IMPLIES, IFF = range(6)
+
+# Models each worker checks between looking for queries refuted elsewhere
+CHECK = 1 << 10
+
+
+def encode(sentences):
+    """
+    Return (nodes, roots): a compact encoding of `sentences` as a list of
+    tuples, each an operator followed by the indices of its operands (or
+    the name of a symbol), where operands come before the nodes using them
+    and shared subsentences appear once, and the index of each sentence.
+    """
+    nodes = []
+    indices = dict()
+
+    def add(sentence):
+        if id(sentence) in indices:
+            return indices[id(sentence)][0]
+        if isinstance(sentence, Symbol):
+            node = (SYMBOL, sentence.name)
+        elif isinstance(sentence, Not):
+            node = (NOT, add(sentence.operand))
+        elif isinstance(sentence, And):
+            node = (AND, *[add(conjunct) for conjunct in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            node = (OR, *[add(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            node = (IMPLIES, add(sentence.antecedent),
+                    add(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            node = (IFF, add(sentence.left), add(sentence.right))
+        else:
+            raise TypeError("must be a logical sentence")
+        indices[id(sentence)] = (len(nodes), sentence)
+        nodes.append(node)
+        return len(nodes) - 1
+
+    roots = [add(sentence) for sentence in sentences]
+    return nodes, roots
+
+
+def decode(nodes, roots):
+    """Return the sentences encoded by `encode`."""
+    sentences = []
+    for op, *operands in nodes:
+        if op == SYMBOL:
+            sentences.append(Symbol(operands[0]))
+            continue
+        operands = [sentences[k] for k in operands]
+        if op == NOT:
+            sentences.append(Not(*operands))
+        elif op == AND:
+            sentences.append(And(*operands))
+        elif op == OR:
+            sentences.append(Or(*operands))
+        elif op == IMPLIES:
+            sentences.append(Implication(*operands))
+        else:
+            sentences.append(Biconditional(*operands))
+    return [sentences[k] for k in roots]
+
+
+def settled(sentence, model):
+    """
+    Return the truth of `sentence` in a partial `model`, or None if it
+    depends on symbols the model leaves out.
+    """
+    if isinstance(sentence, Symbol):
+        return model.get(sentence.name)
+    if isinstance(sentence, Not):
+        value = settled(sentence.operand, model)
+        return None if value is None else not value
+    if isinstance(sentence, Implication):
+        operands, target = [Not(sentence.antecedent), sentence.consequent], True
+    elif isinstance(sentence, Biconditional):
+        left = settled(sentence.left, model)
+        right = settled(sentence.right, model)
+        return None if left is None or right is None else left == right
+    elif isinstance(sentence, And):
+        operands, target = sentence.conjuncts, False
+    else:
+        operands, target = sentence.disjuncts, True
+
+    # A conjunction is settled by any false conjunct and a disjunction by
+    # any true disjunct, and otherwise only once every operand is
+    values = [settled(operand, model) for operand in operands]
+    if target in values:
+        return target
+    return None if None in values else not target
+
+
+# Knowledge base and queries being checked by this worker process, the
+# symbols of the knowledge base in the order they are split on, and which
+# queries any worker has found a counter-model for
+worker_knowledge = None
+worker_queries = None
+worker_names = None
+worker_refuted = None
+
+
+def start_worker(nodes, roots, names, refuted):
+    """Decode the sentences checked by this worker process."""
+    global worker_knowledge, worker_queries, worker_names, worker_refuted
+    worker_knowledge, *worker_queries = decode(nodes, roots)
+    worker_names = names
+    worker_refuted = refuted
+
+
+def search(job):
+    """
+    Check the models of the knowledge base in which its first `fixed`
+    symbols take the values of the bits of `prefix`, given (prefix, fixed),
+    marking each query false in one of them as refuted, and stopping once
+    every query is refuted.
+    """
+    prefix, fixed = job
+    names = worker_names
+    symbols = worker_knowledge.symbols()
+    live = [
+        (k, sorted(query.symbols() - symbols))
+        for k, query in enumerate(worker_queries) if not worker_refuted[k]
+    ]
+
+    # Skip the part altogether if the fixed symbols alone falsify the
+    # knowledge base
+    model = {
+        name: bool(prefix >> i & 1) for i, name in enumerate(names[:fixed])
+    }
+    if settled(worker_knowledge, model) is False:
+        return
+
+    # Visit the other symbols' values in Gray code order, so that each
+    # model differs from the last in one symbol, starting (like
+    # `model_check`) with them all true
+    for name in names[fixed:]:
+        model[name] = True
+    for m in range(1 << (len(names) - fixed)):
+        if m:
+            name = names[fixed + (m & -m).bit_length() - 1]
+            model[name] = not model[name]
+        if m % CHECK == 0:
+            live = [(k, extra) for k, extra in live if not worker_refuted[k]]
+        if not live:
+            return
+        if not worker_knowledge.evaluate(model):
+            continue
+        for k, extra in live:
+            for values in itertools.product([True, False], repeat=len(extra)):
+                model.update(zip(extra, values))
+                if not worker_queries[k].evaluate(model):
+                    worker_refuted[k] = True
+                    break
+        live = [(k, extra) for k, extra in live if not worker_refuted[k]]
+
+
+def entailed(knowledge, queries, workers=None, split=None):
+    """
+    Return set of the `queries` that `knowledge` entails, enumerating
+    models in a pool of `workers` processes (one per CPU by default). The
+    models are split into 2^`split` parts by fixing the first `split`
+    symbols of the knowledge base (by default enough for about eight parts
+    per worker), and every worker stops as soon as each query is false in
+    some model of the knowledge base.
+    """
+    queries = list(queries)
+    workers = workers or os.cpu_count() or 1
+    names = sorted(knowledge.symbols())
+    if split is None:
+        split = (8 * workers - 1).bit_length()
+    split = min(split, len(names))
+
+    # Queries refuted by any worker, shared without a lock since they are
+    # only ever set
+    refuted = multiprocessing.Array("b", len(queries), lock=False)
+    nodes, roots = encode([knowledge] + queries)
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=start_worker,
+        initargs=(nodes, roots, names, refuted)
+    ) as executor:
+        futures = [
+            executor.submit(search, (prefix, split))
+            for prefix in range(1 << split)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+            if all(refuted):
+                executor.shutdown(cancel_futures=True)
+                break
+    return {query for k, query in enumerate(queries) if not refuted[k]}
+
+
+def entails(knowledge, query, workers=None, split=None):
+    """Return whether `knowledge` entails `query`, checking every model."""
+    return bool(entailed(knowledge, [query], workers, split))
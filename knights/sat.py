@@ -0,0 +1,396 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class CNF():
+
+    def __init__(self):
+        """
+        Create an empty formula in conjunctive normal form, where variables
+        are numbered from 1 and a literal is a variable or its negation.
+        """
+        self.count = 0
+        self.clauses = []
+
+        # Variable of each symbol by name, and literal standing for each
+        # sentence already encoded (along with the sentence, so that its id
+        # cannot be reused while the encoding is alive)
+        self.variables = dict()
+        self.literals = dict()
+
+    def variable(self):
+        """Return a new variable."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Add clauses requiring `sentence` to be true."""
+
+        # Conjunctions and disjunctions at the top need no new variables
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([
+                -self.literal(sentence.antecedent),
+                self.literal(sentence.consequent)
+            ])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Return a literal equivalent to `sentence`, adding the clauses that
+        define any new variables needed (Tseitin's encoding).
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if id(sentence) in self.literals:
+            return self.literals[id(sentence)][0]
+
+        if isinstance(sentence, And):
+            operands = [self.literal(c) for c in sentence.conjuncts]
+            x = self.variable()
+            for operand in operands:
+                self.clauses.append([-x, operand])
+            self.clauses.append([x] + [-operand for operand in operands])
+        elif isinstance(sentence, (Or, Implication)):
+            if isinstance(sentence, Or):
+                operands = [self.literal(d) for d in sentence.disjuncts]
+            else:
+                operands = [
+                    -self.literal(sentence.antecedent),
+                    self.literal(sentence.consequent)
+                ]
+            x = self.variable()
+            for operand in operands:
+                self.clauses.append([x, -operand])
+            self.clauses.append([-x] + operands)
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.variable()
+            self.clauses.extend([
+                [-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]
+            ])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[id(sentence)] = (x, sentence)
+        return x
+
+
+class Solver():
+
+    def __init__(self, count, clauses, restart=100, decay=0.95):
+        """
+        Prepare to search for an assignment to variables 1 to `count`
+        satisfying every clause, by conflict-driven clause learning.
+        `restart` is the number of conflicts before the first restart, with
+        later restarts following the Luby sequence, and `decay` how quickly
+        variable activity fades.
+        """
+        self.count = count
+        self.restart = restart
+        self.decay = decay
+
+        # Value (True, False or None), decision level and reason (the clause
+        # that forced it, or None for a decision) of each variable
+        self.values = [None] * (count + 1)
+        self.levels = [0] * (count + 1)
+        self.reasons = [None] * (count + 1)
+        self.phases = [False] * (count + 1)
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        # Activity of each variable, with a heap of (-activity, variable)
+        # entries that are stale once the activity has grown
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        self.queue = [(0.0, var) for var in range(1, count + 1)]
+
+        # Clauses watching each literal, at index 2 * variable (+ 1 if
+        # negative); each clause watches its first two literals
+        self.watches = [[] for k in range(2 * count + 2)]
+        self.clauses = []
+        self.conflicted = False
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            if any(-literal in clause for literal in clause):
+                continue
+            self.attach(clause)
+
+    def index(self, literal):
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def value(self, literal):
+        """Return whether literal is true, False if false, None if unset."""
+        value = self.values[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def attach(self, clause):
+        """Add a clause given before search, at decision level 0."""
+        if not clause:
+            self.conflicted = True
+        elif len(clause) == 1:
+            value = self.value(clause[0])
+            if value is False:
+                self.conflicted = True
+            elif value is None:
+                self.assign(clause[0], None)
+        else:
+            self.clauses.append(clause)
+            self.watches[self.index(clause[0])].append(clause)
+            self.watches[self.index(clause[1])].append(clause)
+
+    def assign(self, literal, reason):
+        var = abs(literal)
+        self.values[var] = literal > 0
+        self.levels[var] = len(self.limits)
+        self.reasons[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assign every literal forced by unit clauses, and return a clause all
+        of whose literals are false, or None if there is no conflict.
+        """
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[self.index(false)]
+            kept = []
+            k = 0
+            while k < len(watching):
+                clause = watching[k]
+                k += 1
+
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for j in range(2, len(clause)):
+                    if self.value(clause[j]) is not False:
+                        clause[1], clause[j] = clause[j], clause[1]
+                        self.watches[self.index(clause[1])].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) is False:
+                        kept.extend(watching[k:])
+                        self.watches[self.index(false)] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+            self.watches[self.index(false)] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Return (clause, level): a clause learned from `conflict` by resolving
+        back to the first unique implication point, whose first literal is
+        the only one at the current level, and the level to backjump to.
+        """
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        k = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                var = abs(other)
+                if var in seen or self.levels[var] == 0:
+                    continue
+                seen.add(var)
+                self.bump(var)
+                if self.levels[var] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Resolve on the most recent literal at this level
+            while abs(self.trail[k]) not in seen:
+                k -= 1
+            literal = self.trail[k]
+            k -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal at the highest remaining level second
+        j = max(
+            range(1, len(learned)), key=lambda j: self.levels[abs(learned[j])]
+        )
+        learned[1], learned[j] = learned[j], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, var):
+        """Raise a variable's activity, rescaling them all if needed."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.queue = [
+                (-self.activity[v], v) for v in range(1, self.count + 1)
+                if self.values[v] is None
+            ]
+            heapq.heapify(self.queue)
+        else:
+            heapq.heappush(self.queue, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        """Undo every assignment above decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.phases[var] = literal > 0
+            self.values[var] = None
+            self.reasons[var] = None
+            heapq.heappush(self.queue, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Return the unassigned variable of highest activity, or None."""
+        while self.queue:
+            activity, var = heapq.heappop(self.queue)
+            if self.values[var] is None and -activity == self.activity[var]:
+                return var
+        return None
+
+    def solve(self):
+        """
+        Return list of the value of each variable (indexed from 1) in an
+        assignment satisfying every clause, or None if there is none.
+        """
+        if self.conflicted or self.propagate() is not None:
+            return None
+
+        conflicts = 0
+        restarts = 0
+        budget = self.restart * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    return None
+                conflicts += 1
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.clauses.append(learned)
+                    self.watches[self.index(learned[0])].append(learned)
+                    self.watches[self.index(learned[1])].append(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= self.decay
+                continue
+
+            # Restart, keeping learned clauses and activity
+            if conflicts >= budget:
+                restarts += 1
+                conflicts = 0
+                budget = self.restart * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            var = self.decide()
+            if var is None:
+                return list(self.values)
+            self.limits.append(len(self.trail))
+            self.assign(var if self.phases[var] else -var, None)
+
+
+def luby(i):
+    """Return the `i`th term (from 0) of the Luby sequence 1 1 2 1 1 2 4..."""
+
+    # Find the smallest complete subsequence, of length 2^k - 1, containing
+    # term i, then look within its repeated first half
+    size, power = 1, 0
+    while size < i + 1:
+        size = 2 * size + 1
+        power += 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+def satisfy(sentence):
+    """
+    Return a model (dict mapping each symbol name to a truth value) in
+    which `sentence` is true, or None if there is none.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    values = Solver(cnf.count, cnf.clauses).solve()
+    if values is None:
+        return None
+    return {
+        name: bool(values[var]) for name, var in cnf.variables.items()
+    }
+
+
+def entails(knowledge, query):
+    """
+    Return whether `knowledge` entails `query`, that is, whether knowledge
+    and the negation of query cannot both be true.
+    """
+    return satisfy(And(knowledge, Not(query))) is None
+
+
+def entailed(knowledge, queries):
+    """
+    Return set of the `queries` that `knowledge` entails. Knowledge is
+    encoded once, and each model found for it rules out every query that
+    is false there, so that a solver need only be run once per query that
+    is entailed or refuted by a model of its own.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literals = [cnf.literal(query) for query in queries]
+
+    def holds(values, literal):
+        return values[abs(literal)] == (literal > 0)
+
+    values = Solver(cnf.count, cnf.clauses).solve()
+    if values is None:
+        return set(queries)
+    live = [k for k in range(len(queries)) if holds(values, literals[k])]
+    result = set()
+    while live:
+        k = live.pop()
+        values = Solver(cnf.count, cnf.clauses + [[-literals[k]]]).solve()
+        if values is None:
+            result.add(queries[k])
+        else:
+            live = [j for j in live if holds(values, literals[j])]
+    return result
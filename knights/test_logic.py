@@ -0,0 +1,48 @@
+from logic import And, Biconditional, Implication, Not, Or, Symbol, model_check
+
+X = Symbol("X")
+Y = Symbol("Y")
+
+
+def test_equal_sentences_are_interned():
+    assert Not(X) is Not(Symbol("X"))
+    assert Or(X, Not(Y)) is Or(X, Not(Y))
+
+
+def test_conjunctions_equal_for_now_are_not_aliased():
+    for build in [
+        lambda a: Implication(X, a),
+        lambda a: Biconditional(a, Y),
+        lambda a: Or(a, X),
+        lambda a: Not(a),
+        lambda a: Not(Implication(X, a))
+    ]:
+        a = And()
+        b = And()
+        first = build(a)
+        second = build(b)
+        assert first is not second
+        a.add(Not(X))
+        b.add(Y)
+        assert "Y" in second.formula()
+        assert second.symbols() >= {"Y"}
+        assert first != second
+
+
+def test_entailment_after_adding_to_a_conjunction():
+    a = And()
+    Implication(X, a)
+    b = And()
+    sentence = Implication(X, b)
+    a.add(Not(X))
+    b.add(Y)
+    assert not model_check(sentence, Not(X))
+    assert model_check(And(sentence, X), Y)
+
+
+def test_interned_keys_survive_adding():
+    a = And(X)
+    sentence = Not(a)
+    a.add(Y)
+    assert Not(a) is sentence
+    assert len([key for key in Not.interned if key == (id(a),)]) == 1
@@ -0,0 +1,160 @@
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+ZEROS = np.uint64(0)
+
+# Truth of each of the first six symbols across the 64 models packed in a
+# word: bit m is the model in which symbol i has the value of bit i of m
+PATTERNS = [
+    np.uint64(sum(1 << m for m in range(64) if m >> i & 1))
+    for i in range(6)
+]
+
+NOT, AND, OR, IMPLIES, IFF = range(5)
+
+
+class Program():
+
+    def __init__(self, sentences, names):
+        """
+        Compile `sentences` into instructions that evaluate them all at once
+        over blocks of models, given the bit columns of the symbols named in
+        `names`. Register k holds the kth symbol's column, later registers
+        hold each distinct subsentence, evaluated once however often used.
+        """
+        self.index = {name: k for k, name in enumerate(names)}
+        self.count = len(names)
+        self.instructions = []
+
+        # Register of each sentence compiled, by id, along with the sentence
+        # so that its id cannot be reused
+        self.registers = dict()
+        self.outputs = [self.compile(sentence) for sentence in sentences]
+
+    def compile(self, sentence):
+        """Return the register that will hold the value of `sentence`."""
+        if isinstance(sentence, Symbol):
+            return self.index[sentence.name]
+        if id(sentence) in self.registers:
+            return self.registers[id(sentence)][0]
+
+        if isinstance(sentence, Not):
+            instruction = (NOT, [self.compile(sentence.operand)])
+        elif isinstance(sentence, And):
+            instruction = (AND, [self.compile(c) for c in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            instruction = (OR, [self.compile(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            instruction = (IMPLIES, [
+                self.compile(sentence.antecedent),
+                self.compile(sentence.consequent)
+            ])
+        elif isinstance(sentence, Biconditional):
+            instruction = (IFF, [
+                self.compile(sentence.left), self.compile(sentence.right)
+            ])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        register = self.count + len(self.instructions)
+        self.instructions.append(instruction)
+        self.registers[id(sentence)] = (register, sentence)
+        return register
+
+    def run(self, columns):
+        """
+        Return the bit columns of each compiled sentence, given the bit
+        columns (arrays or scalars of 64-bit words) of each symbol.
+        """
+        values = list(columns)
+        for op, operands in self.instructions:
+            if op == NOT:
+                value = ~values[operands[0]]
+            elif op == AND:
+                value = ONES
+                for operand in operands:
+                    value = value & values[operand]
+            elif op == OR:
+                value = ZEROS
+                for operand in operands:
+                    value = value | values[operand]
+            elif op == IMPLIES:
+                value = ~values[operands[0]] | values[operands[1]]
+            else:
+                value = ~(values[operands[0]] ^ values[operands[1]])
+            values.append(value)
+        return [values[k] for k in self.outputs]
+
+
+def blocks(count, bits=12):
+    """
+    Yield (start, columns, mask) for each block of models of `count`
+    symbols in turn, where model m gives the kth symbol the value of bit k
+    of m. A block is up to 2^`bits` words of 64 models, starting at model
+    `start`; `columns` holds the truth of each symbol across them, and
+    `mask` the bits that stand for models at all.
+    """
+
+    # Symbols after the first six vary by word within a block, and those
+    # after the first 6 + `bits` only from one block to the next
+    bits = max(0, min(bits, count - 6))
+    words = np.arange(1 << bits, dtype=np.uint64)
+    within = [
+        np.where(words >> np.uint64(i) & np.uint64(1), ONES, ZEROS)
+        for i in range(bits)
+    ]
+    columns = PATTERNS[:count] + within
+    mask = ONES if count >= 6 else np.uint64((1 << (1 << count)) - 1)
+
+    size = 1 << (6 + bits)
+    for block in range(1 << max(0, count - 6 - bits)):
+        yield block * size, columns + [
+            ONES if block >> i & 1 else ZEROS
+            for i in range(count - len(columns))
+        ], mask
+
+
+def counter_model(knowledge, query, bits=12):
+    """
+    Return a model (dict mapping each symbol name to a truth value) in
+    which `knowledge` is true but `query` is false, or None if there is
+    none, checking 64 models per bitwise operation, 2^`bits` words at a
+    time, and stopping at the first block with such a model.
+    """
+    names = sorted(knowledge.symbols() | query.symbols())
+    program = Program([knowledge, query], names)
+    for start, columns, mask in blocks(len(names), bits):
+        kb, q = program.run(columns)
+        found = np.atleast_1d(kb & ~q & mask)
+        words = np.flatnonzero(found)
+        if len(words):
+            word = int(found[words[0]])
+            m = start + 64 * int(words[0]) + (word & -word).bit_length() - 1
+            return {name: bool(m >> k & 1) for k, name in enumerate(names)}
+    return None
+
+
+def entails(knowledge, query):
+    """Return whether `knowledge` entails `query`, checking every model."""
+    return counter_model(knowledge, query) is None
+
+
+def entailed(knowledge, queries, bits=12):
+    """
+    Return set of the `queries` that `knowledge` entails, evaluating them
+    all in one sweep over the models and stopping early once none remain.
+    """
+    names = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    program = Program([knowledge] + queries, names)
+    live = list(range(len(queries)))
+    for start, columns, mask in blocks(len(names), bits):
+        kb, *values = program.run(columns)
+        kb = kb & mask
+        live = [k for k in live if not np.any(kb & ~values[k])]
+        if not live:
+            break
+    return {queries[k] for k in live}